@@ -0,0 +1,106 @@
+# Headless HTTP service for the suggestion and emissions queries.
+#
+#   uvicorn api:app --workers 4
+#
+# The dataset is loaded once per worker process at startup (core.get_dataset)
+# and reloaded by the first request that sees a source CSV change.
+# Endpoints are async; the pandas work runs in the threadpool so requests
+# are served concurrently. Results are JSON by default, or an Arrow IPC
+# stream with ?format=arrow.
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import pyarrow as pa
+from fastapi import FastAPI, HTTPException, Query, Response
+from starlette.concurrency import run_in_threadpool
+
+import core
+from similar import DEFAULT_COST
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(core.get_dataset)
+    yield
+
+
+app = FastAPI(title='BASS-ML model explorer', lifespan=lifespan)
+
+
+def frame_response(df, fmt):
+    if fmt == 'arrow':
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+    # to_json maps NaN/NaT to null, which json.dumps would not
+    body = df.to_json(orient='records', date_format='iso')
+    return Response(body, media_type='application/json')
+
+
+@app.get('/health')
+async def health():
+    ds = await run_in_threadpool(core.get_dataset)
+    return {'status': 'ok', 'version': ds.version, 'models': ds.n_models()}
+
+
+@app.get('/tasks')
+async def tasks():
+    ds = await run_in_threadpool(core.get_dataset)
+    return ds.tasks()
+
+
+@app.get('/suggest')
+async def suggest(
+    task: str,
+    max_power: Optional[float] = Query(None, ge=0, description='Max training power (W)'),
+    max_params: Optional[float] = Query(None, ge=0, description='Max parameters (billions)'),
+    max_co2: Optional[float] = Query(None, ge=0, description='Max carbon emissions (kg CO2)'),
+    topk: int = Query(5, ge=1, le=100),
+    ranking: str = Query('power', pattern='^(power|pareto)$', description='power: lowest power first; pareto: skyline only'),
+    format: str = Query('json', pattern='^(json|arrow)$'),
+):
+    def run():
+        ds = core.get_dataset()
+        sug = ds.suggest(task, max_power, max_params, max_co2, topk, pareto=ranking == 'pareto')
+        cols = [c for c in core.SUGGEST_COLUMNS if c in sug.columns]
+        return sug[cols]
+    return frame_response(await run_in_threadpool(run), format)
+
+
+@app.get('/similar')
+async def similar(
+    system: str,
+    topk: int = Query(5, ge=1, le=100),
+    cheaper_by: Optional[str] = Query(DEFAULT_COST, description='Only models with a lower value in this column'),
+    format: str = Query('json', pattern='^(json|arrow)$'),
+):
+    def run():
+        ds = core.get_dataset()
+        if not hasattr(ds, 'similar'):
+            # needs the in-memory nearest-neighbour index
+            raise HTTPException(status_code=501, detail='Not available with this backend')
+        if cheaper_by is not None and cheaper_by not in ds.models.columns:
+            raise HTTPException(status_code=422, detail=f'Unknown column {cheaper_by!r}')
+        near = ds.similar(system, topk, cheaper_by)
+        if near is None:
+            raise HTTPException(status_code=404, detail='Unknown system')
+        cols = [c for c in ['distance'] + core.SUGGEST_COLUMNS if c in near.columns]
+        return near[cols]
+    return frame_response(await run_in_threadpool(run), format)
+
+
+@app.get('/emissions')
+async def emissions(
+    project: Optional[List[str]] = Query(None),
+    format: str = Query('json', pattern='^(json|arrow)$'),
+):
+    def run():
+        em = core.get_dataset().project_emissions(project)
+        if project and em.empty:
+            raise HTTPException(status_code=404, detail='No matching projects')
+        return em
+    return frame_response(await run_in_threadpool(run), format)
@@ -0,0 +1,127 @@
+# Background execution for the expensive stages of a rerun.
+#
+# Streamlit runs a session's script on the session's own thread and starts
+# it over on every widget change, so dragging a slider queues one rerun per
+# intermediate position, each paying for its query or chart before the next
+# one can start. latest() hands a stage's work to a process-wide thread pool
+# instead:
+#   - work is keyed; a session asking for a key already in flight waits on
+#     the same future, so identical queries from many sessions run once
+#   - a session asking for a new key drops its claim on its previous one; a
+#     superseded call nobody else waits for is cancelled if it has not
+#     started yet
+#   - while a session's previous call is still running (the user is mid
+#     drag), the new one is only submitted after DEBOUNCE_S, and the wait
+#     polls session state, which is a point where Streamlit stops the run
+#     for a newer widget event; superseded positions are then never queued
+# The previous run's elements stay on screen until the rerun reaches them,
+# so the page shows the last completed result until the new one lands.
+# The work itself must not call Streamlit: it runs outside any session. It
+# runs in a copy of the submitting session's contextvars, so its profiling
+# spans (suggest.query, suggest.filter, ...) and cache misses land in that
+# session's trace, nested under the stage's background.* span. A computation
+# shared by several sessions reports to the session that submitted it; the
+# others record only their wait.
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import profiling
+
+DEBOUNCE_S = 0.15
+POLL_S = 0.05
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+
+class SharedCalls:
+    # key -> [future, number of sessions waiting on it]
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bass-bg')
+        # reentrant: a future that is already done runs its callback at once
+        self._lock = threading.RLock()
+        self._calls = {}
+        self.started = 0
+        self.shared = 0
+        self.cancelled = 0
+
+    def claim(self, key, compute):
+        # the future computing key, submitting compute() if none is in flight
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                future = self.pool.submit(contextvars.copy_context().run, compute)
+                call = self._calls[key] = [future, 0]
+                self.started += 1
+                future.add_done_callback(lambda f, key=key: self._done(key, f))
+            else:
+                self.shared += 1
+            call[1] += 1
+            return call[0]
+
+    def release(self, key, future):
+        # one waiter gave up on key; the last one cancels it if still queued
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None or call[0] is not future:
+                return
+            call[1] -= 1
+            if call[1] <= 0 and future.cancel():
+                self.cancelled += 1
+
+    def _done(self, key, future):
+        # finished (or cancelled) calls leave the table; their results live
+        # on in whatever cache compute() fills
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call[0] is future:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'started': self.started,
+                    'shared': self.shared, 'cancelled': self.cancelled}
+
+
+# shared by every session in this process
+CALLS = SharedCalls()
+
+
+def latest(stage, key, compute, calls=CALLS, debounce=DEBOUNCE_S):
+    # compute() for this session's current widget values, run on the pool
+    # (Streamlit apps only). stage names the slot in session state: one
+    # pending call per stage and session
+    import streamlit as st
+
+    slot = f'{stage}.pending'
+    pending = st.session_state.get(slot)
+    with profiling.span(f'background.{stage}') as sp:
+        if pending is not None and pending[0] == key:
+            future = pending[1]
+        else:
+            if pending is not None:
+                calls.release(*pending)
+                st.session_state[slot] = None
+                if not pending[1].done():
+                    _wait(slot, debounce)
+            future = calls.claim(key, compute)
+            st.session_state[slot] = (key, future)
+        sp.set(ready=future.done())
+        while True:
+            try:
+                return future.result(timeout=POLL_S)
+            except FutureTimeout:
+                # reading session state lets a newer rerun stop this one
+                st.session_state.get(slot)
+
+
+def _wait(slot, seconds):
+    import streamlit as st
+
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        time.sleep(POLL_S)
+        st.session_state.get(slot)
@@ -0,0 +1,155 @@
+# Batch mode for the Suggest query: answer a whole table of
+# (task, max_power, max_params, max_co2, topk) queries in one pass.
+#
+#   python batch_suggest.py queries.csv -o report.parquet
+#   python batch_suggest.py --all-tasks --power 1e13,1e15 --params 10,100,1000 -o report.csv
+#
+# Queries are grouped by task; each task's candidate rows are gathered once
+# in ranking order, and all budgets for that task are swept over them as a
+# single (queries x candidates) mask whose running count picks the first k
+# passing rows. Rows are identical to calling the Suggest query per row.
+import argparse
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+
+import core
+from suggest import CO2_COL, PARAMS_COL, POWER_COL
+
+QUERY_COLUMNS = ['task', 'max_power', 'max_params', 'max_co2', 'topk']
+
+# cap on queries x candidates cells per mask, to bound memory
+MAX_CELLS = 1 << 24
+
+
+def normalize_queries(queries):
+    q = pd.DataFrame(queries).reset_index(drop=True)
+    if 'task' not in q.columns:
+        raise ValueError("queries need a 'task' column")
+    bad = ~q['task'].map(lambda t: isinstance(t, str))
+    if bad.any():
+        rows = ', '.join(map(str, q.index[bad][:5]))
+        raise ValueError(f"queries need a task string; missing or not text in row(s) {rows}")
+    for col, default in [('max_power', np.inf), ('max_params', np.inf),
+                         ('max_co2', np.nan), ('topk', 5)]:
+        if col not in q.columns:
+            q[col] = default
+    q['max_power'] = pd.to_numeric(q['max_power'], errors='coerce').fillna(np.inf)
+    q['max_params'] = pd.to_numeric(q['max_params'], errors='coerce').fillna(np.inf)
+    # NaN max_co2 means no CO2 limit, like the app when it shows no slider
+    q['max_co2'] = pd.to_numeric(q['max_co2'], errors='coerce')
+    q['topk'] = pd.to_numeric(q['topk'], errors='coerce').fillna(5).astype(np.int64)
+    q.insert(0, 'query_id', np.arange(len(q)))
+    return q[['query_id'] + QUERY_COLUMNS]
+
+
+def batch_positions(df, task_index, ranker, queries):
+    # -> (query_ids, ranks, row positions) for every result row
+    power = df[POWER_COL].to_numpy(dtype=np.float64)
+    params = df[PARAMS_COL].to_numpy(dtype=np.float64)
+    co2 = df[CO2_COL].to_numpy(dtype=np.float64) if CO2_COL in df.columns else None
+    out_q, out_rank, out_pos = [], [], []
+    for task, group in queries.groupby('task', sort=False):
+        cand = task_index.containing(task)
+        if not len(cand):
+            continue
+        cand = cand[np.argsort(ranker.rank[cand])]
+        c_power, c_params = power[cand], params[cand]
+        c_co2 = co2[cand] if co2 is not None else None
+        step = max(1, MAX_CELLS // len(cand))
+        for start in range(0, len(group), step):
+            g = group.iloc[start:start + step]
+            ok = (c_power[None, :] <= g['max_power'].to_numpy()[:, None]) & \
+                 (c_params[None, :] <= g['max_params'].to_numpy()[:, None] * 1e9)
+            limit = g['max_co2'].to_numpy()
+            if c_co2 is not None and not np.isnan(limit).all():
+                ok &= np.isnan(limit)[:, None] | (c_co2[None, :] <= limit[:, None])
+            # running count of passing candidates = 1-based rank in the result
+            seen = np.cumsum(ok, axis=1)
+            keep = ok & (seen <= g['topk'].to_numpy()[:, None])
+            qi, ci = np.nonzero(keep)
+            out_q.append(g['query_id'].to_numpy()[qi])
+            out_rank.append(seen[qi, ci])
+            out_pos.append(cand[ci])
+    if not out_q:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(out_q), np.concatenate(out_rank), np.concatenate(out_pos)
+
+
+def batch_suggest(queries, dataset=None, columns=None):
+    # one row per (query, rank) with the query fields and the model columns
+    ds = dataset or core.get_dataset()
+    queries = normalize_queries(queries)
+    qid, rank, pos = batch_positions(ds.models, ds.engine.task_index, ds.engine.ranker, queries)
+    cols = [c for c in (columns or core.SUGGEST_COLUMNS) if c in ds.models.columns]
+    result = ds.models.iloc[pos][cols].reset_index(drop=True)
+    head = queries.iloc[qid].reset_index(drop=True).rename(columns={'task': 'query_task'})
+    head.insert(1, 'rank', rank)
+    out = pd.concat([head, result], axis=1)
+    return out.sort_values(['query_id', 'rank'], kind='stable', ignore_index=True)
+
+
+def loop_suggest(queries, dataset=None, columns=None):
+    # reference implementation: the Suggest query once per row
+    ds = dataset or core.get_dataset()
+    queries = normalize_queries(queries)
+    cols = [c for c in (columns or core.SUGGEST_COLUMNS) if c in ds.models.columns]
+    frames = []
+    for q in queries.itertuples(index=False):
+        co2 = None if np.isnan(q.max_co2) else q.max_co2
+        sug = ds.suggest(q.task, q.max_power, q.max_params, co2, q.topk)[cols]
+        head = pd.DataFrame({'query_id': q.query_id, 'rank': np.arange(1, len(sug) + 1)})
+        for col in QUERY_COLUMNS:
+            head[col] = getattr(q, col)
+        frames.append(pd.concat([head.rename(columns={'task': 'query_task'}),
+                                 sug.reset_index(drop=True)], axis=1))
+    out = pd.concat(frames, ignore_index=True)
+    return out[['query_id', 'rank', 'query_task'] + QUERY_COLUMNS[1:] + cols]
+
+
+def make_grid(tasks, powers=(np.inf,), params=(np.inf,), co2s=(np.nan,), topk=5):
+    rows = itertools.product(tasks, powers, params, co2s)
+    return pd.DataFrame(list(rows), columns=QUERY_COLUMNS[:-1]).assign(topk=topk)
+
+
+def write_table(df, path):
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _floats(text):
+    return [float(v) for v in text.split(',')] if text else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Answer a table of Suggest queries in one pass.')
+    parser.add_argument('queries', nargs='?', help='CSV/Parquet with columns ' + ', '.join(QUERY_COLUMNS))
+    parser.add_argument('-o', '--output', required=True, help='.parquet or .csv')
+    parser.add_argument('--all-tasks', action='store_true', help='query every task over the budget grid')
+    parser.add_argument('--power', help='comma-separated max training power values (W)')
+    parser.add_argument('--params', help='comma-separated max parameter values (billions)')
+    parser.add_argument('--co2', help='comma-separated max CO2 values (kg)')
+    parser.add_argument('--topk', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    ds = core.get_dataset()
+    if args.all_tasks:
+        queries = make_grid(ds.tasks(), _floats(args.power) or [np.inf],
+                            _floats(args.params) or [np.inf], _floats(args.co2) or [np.nan], args.topk)
+    elif args.queries:
+        read = pd.read_parquet if args.queries.endswith('.parquet') else pd.read_csv
+        queries = read(args.queries)
+    else:
+        parser.error('give a queries file or --all-tasks')
+    result = batch_suggest(queries, ds)
+    write_table(result, args.output)
+    print(f"{len(queries)} queries -> {len(result)} rows in {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
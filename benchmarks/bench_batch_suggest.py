@@ -0,0 +1,37 @@
+# Batch vs per-query loop for the Suggest query over a task x budget grid.
+#
+#   python -m benchmarks.bench_batch_suggest
+import time
+
+import numpy as np
+import pandas as pd
+
+import core
+from batch_suggest import batch_suggest, loop_suggest, make_grid
+
+
+def main():
+    ds = core.get_dataset()
+    power = ds.models['training_power_(watts)'].dropna()
+    queries = make_grid(
+        ds.tasks(),
+        powers=list(np.quantile(power, [0.1, 0.25, 0.5, 0.75, 1.0])) + [np.inf],
+        params=[1, 10, 100, 1000],
+        topk=10,
+    )
+    # bypass the query cache so the loop pays for every query
+    ds.engine.cache.invalidate()
+    ds.engine.cache.maxsize = 0
+    t0 = time.perf_counter()
+    expected = loop_suggest(queries, ds)
+    t1 = time.perf_counter()
+    got = batch_suggest(queries, ds)
+    t2 = time.perf_counter()
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    print(f"{len(queries)} queries, {len(got)} result rows (identical)")
+    print(f"  loop  {(t1 - t0) * 1e3:9.1f} ms")
+    print(f"  batch {(t2 - t1) * 1e3:9.1f} ms  ({(t1 - t0) / (t2 - t1):.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# Compare the old per-row difflib.get_close_matches path with NameMatcher.
+#
+#   python -m benchmarks.bench_name_matching
+#
+# Runs on the bundled data: model systems vs bloom project names (the
+# merge_emissions case) and, as a larger workload, notable_ai_models model
+# names vs large_scale systems. Checks both paths agree before timing.
+import difflib
+import time
+
+import ingest
+from name_matching import NameMatcher
+
+
+def difflib_path(words, candidates, cutoff):
+    out = {}
+    for w in words:
+        m = difflib.get_close_matches(w, candidates, n=1, cutoff=cutoff)
+        out[w] = m[0] if m else None
+    return out
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def run_case(label, words, candidates, cutoff=0.8):
+    words = sorted({w for w in words if isinstance(w, str) and w.strip()})
+    candidates = [str(c) for c in candidates]
+    expected, t_old = timed(difflib_path, words, candidates, cutoff)
+    got, t_new = timed(lambda: NameMatcher(candidates).match_many(words, cutoff))
+    mismatches = sum(expected[w] != got.get(w) for w in words)
+    print(f"{label}: {len(words)} names x {len(candidates)} candidates")
+    print(f"  difflib     {t_old * 1e3:10.1f} ms")
+    print(f"  NameMatcher {t_new * 1e3:10.1f} ms  ({t_old / max(t_new, 1e-9):.0f}x)")
+    print(f"  matched {sum(v is not None for v in got.values())}, mismatches {mismatches}")
+    return mismatches
+
+
+def main():
+    models = ingest.load_models()
+    em = ingest.load_emissions()
+    notable = ingest.load_notable()
+    bad = run_case('merge_emissions', models['system'], em['project_name'].dropna())
+    bad += run_case('notable vs systems', notable['model'], models['system'].dropna())
+    raise SystemExit(1 if bad else 0)
+
+
+if __name__ == '__main__':
+    main()
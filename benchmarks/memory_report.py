@@ -0,0 +1,35 @@
+# Resident-memory footprint of the model tables before/after the compact
+# schema (schema.py), for sizing Streamlit workers.
+#
+#   python -m benchmarks.memory_report
+import pandas as pd
+
+import ingest
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def report(label, before, after):
+    b, a = frame_bytes(before), frame_bytes(after)
+    print(f"{label}: {len(before)} rows")
+    print(f"  plain cleaned frame  {b / 1e6:8.2f} MB  ({before.shape[1]} columns)")
+    print(f"  compact schema       {a / 1e6:8.2f} MB  ({after.shape[1]} columns, "
+          f"{before.shape[1] - after.shape[1]} lazy)")
+    print(f"  saving               {100 * (1 - a / b):7.1f} %")
+    by_col = (before.memory_usage(deep=True, index=False)
+              .sub(after.memory_usage(deep=True, index=False), fill_value=0)
+              .sort_values(ascending=False).head(5))
+    print("  largest savings: " + ", ".join(f"{c} {v / 1e3:.0f} kB" for c, v in by_col.items()))
+
+
+def main():
+    report('large_scale_ai_models_added_cols.csv',
+           ingest.clean_models(pd.read_csv(ingest.MODELS_CSV)), ingest.load_models())
+    report('notable_ai_models.csv',
+           ingest.clean_notable(pd.read_csv(ingest.NOTABLE_CSV)), ingest.load_notable())
+
+
+if __name__ == '__main__':
+    main()
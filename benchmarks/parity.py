@@ -0,0 +1,107 @@
+# Parity check of the DuckDB backend (lazy_backend.py) against the pandas one,
+# both built by core.load_dataset as the API builds them.
+#
+#   python -m benchmarks.parity                 # bundled CSVs
+#   python -m benchmarks.parity --scale 10      # a synthetic scale-up
+#
+# Runs every task through the Suggest query under a grid of limits, with
+# both rankings, plus the task list and the per-project emission totals,
+# and compares the answers row by row. Exits non-zero on any mismatch.
+import argparse
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import core
+import ingest
+from benchmarks.synthetic import DEFAULT_DIR, write_scaled
+from catalog import CATALOG_SOURCES
+from snapshot import cache_dir_for
+
+# compared columns: what the API returns plus the ranking objectives
+COLUMNS = core.SUGGEST_COLUMNS + ['citations', 'domain', 'publication_date']
+
+
+def comparable(df, columns):
+    # both backends' frames with one dtype per kind of column
+    out = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            out[col] = pd.to_datetime(s).astype('datetime64[ns]').to_numpy()
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            out[col] = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            out[col] = [None if pd.isna(v) else str(v) for v in s]
+    return pd.DataFrame(out, index=pd.Index([str(v) for v in df.index]))
+
+
+def same(a, b, columns, label, failures):
+    a, b = comparable(a, columns), comparable(b, columns)
+    try:
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, rtol=1e-9, check_like=True)
+    except AssertionError as err:
+        failures.append(f"{label}: {str(err).splitlines()[0]}")
+
+
+def limits(ds):
+    # no limit, or the median of the column
+    cols = ['training_power_(watts)', 'parameters', core.CO2_COL]
+    medians = [float(ds.models[c].median()) for c in cols]
+    medians[1] /= 1e9  # parameters are given in billions
+    return [[None, m] for m in medians]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Compare the DuckDB backend with the pandas one')
+    ap.add_argument('--scale', type=int, default=None, help='synthetic scale-up instead of the bundled files')
+    ap.add_argument('--topk', type=int, nargs='+', default=[10])
+    args = ap.parse_args(argv)
+
+    sources, emissions_csv, cache_dir = CATALOG_SOURCES, ingest.EMISSIONS_CSV, None
+    if args.scale:
+        # the scaled copies of the sources synthetic.py writes, the bundled
+        # file for any other catalog source
+        folder = write_scaled(args.scale, DEFAULT_DIR)
+        scaled = lambda p: os.path.join(folder, os.path.basename(p))
+        sources = tuple(scaled(p) if os.path.exists(scaled(p)) else p for p in CATALOG_SOURCES)
+        emissions_csv = scaled(ingest.EMISSIONS_CSV)
+        cache_dir = cache_dir_for(emissions_csv)
+    pd_ds = core.load_dataset('pandas', sources, emissions_csv, cache_dir)
+    db_ds = core.load_dataset('duckdb', sources, emissions_csv, cache_dir)
+
+    failures = []
+    if pd_ds.tasks() != db_ds.tasks():
+        failures.append('tasks differ')
+    if pd_ds.n_models() != db_ds.n_models():
+        failures.append('model counts differ')
+    em_cols = list(pd_ds.em_proj.columns)
+    same(pd_ds.project_emissions().set_index('project_name').sort_index(),
+         db_ds.project_emissions().set_index('project_name').sort_index(),
+         [c for c in em_cols if c != 'project_name'], 'project_emissions', failures)
+
+    powers, params, co2s = limits(pd_ds)
+    n = 0
+    for task in pd_ds.tasks():
+        for power, param, co2, topk, pareto in itertools.product(powers, params, co2s, args.topk, [False, True]):
+            label = f"suggest({task!r}, power={power}, params={param}, co2={co2}, topk={topk}, pareto={pareto})"
+            same(pd_ds.suggest(task, power, param, co2, topk, pareto),
+                 db_ds.suggest(task, power, param, co2, topk, pareto), COLUMNS, label, failures)
+            n += 1
+    print(f"{n} suggest queries, {len(pd_ds.tasks())} tasks, {len(em_cols)} emission columns compared")
+    for f in failures[:20]:
+        print('MISMATCH', f)
+    if failures:
+        print(f"{len(failures)} mismatches")
+        return 1
+    print('pandas and duckdb backends agree')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
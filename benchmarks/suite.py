@@ -0,0 +1,387 @@
+# Benchmark suite for the load, merge, filter and rank hot paths.
+#
+#   python -m benchmarks.suite                      # x1, x10, x100
+#   python -m benchmarks.suite --scale 1000 --case 'warm.*' --repeat 3
+#   python -m benchmarks.suite --compare-only       # latest run vs the one before
+#
+# Every case runs against synthetic scale-ups of the bundled CSVs (see
+# synthetic.py). Each result (median/min wall time over --repeat runs, plus
+# rows and payload sizes) is appended to benchmarks/results/history.jsonl with
+# the commit, host and library versions, and compared with the previous run of
+# the same case on the same host so regressions show up in the output.
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import core
+import ingest
+from catalog import load_catalog
+from benchmarks.synthetic import DEFAULT_DIR, write_scaled
+from emissions import stream_runs, summarize_projects
+from indexes import TokenIndex
+from name_matching import NameMatcher
+from plot_backend import reduce_xy
+from rollups import RollupStore
+from similar import DEFAULT_COST, SimilarIndex
+from snapshot import cache_dir_for
+from suggest import SuggestEngine, suggest_positions
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'history.jsonl')
+DEFAULT_SCALES = [1, 10, 100]
+REGRESSION_RATIO = 1.25
+# ignore ratio changes on cases this fast; timer noise dominates
+NOISE_FLOOR_S = 1e-3
+
+CASES = {}
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+class Context:
+    # paths of one scaled dataset plus lazily loaded frames shared by cases
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.models_csv = os.path.join(folder, os.path.basename(ingest.MODELS_CSV))
+        self.notable_csv = os.path.join(folder, os.path.basename(ingest.NOTABLE_CSV))
+        self.emissions_csv = os.path.join(folder, os.path.basename(ingest.EMISSIONS_CSV))
+        self._memo = {}
+
+    def memo(self, key, build):
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def clear_snapshots(self):
+        shutil.rmtree(cache_dir_for(self.models_csv), ignore_errors=True)
+
+    @property
+    def models(self):
+        return self.memo('models', lambda: ingest.load_models(self.models_csv))
+
+    @property
+    def notable(self):
+        return self.memo('notable', lambda: ingest.load_notable(self.notable_csv))
+
+    @property
+    def em_proj(self):
+        return self.memo('em_proj', lambda: summarize_projects(runs=stream_runs(self.emissions_csv)))
+
+    @property
+    def merged(self):
+        return self.memo('merged', lambda: core.merge_emissions(
+            self.models, self.em_proj, cache_dir=tempfile.mkdtemp(prefix='bench-match-')))
+
+    @property
+    def engine(self):
+        return self.memo('engine', lambda: SuggestEngine(self.merged, 'bench'))
+
+    @property
+    def tasks(self):
+        # the ten most common task labels, i.e. the typical Suggest queries
+        return self.memo('tasks', lambda: list(self.merged['task'].value_counts().index[:10]))
+
+
+# --- cases ---------------------------------------------------------------
+# a case takes the Context and returns (setup, run): setup() runs untimed
+# before every repetition, run() is timed and may return a dict of metrics
+
+def _cold(load):
+    def make(ctx):
+        return ctx.clear_snapshots, lambda: {'rows': len(load(ctx))}
+    return make
+
+
+def _warm(load):
+    def make(ctx):
+        load(ctx)  # prime the snapshot outside the timing
+        def run():
+            df = load(ctx)
+            return {'rows': len(df), 'frame_mb': round(df.memory_usage(deep=True).sum() / 1e6, 2)}
+        return None, run
+    return make
+
+
+case('cold.load_models')(_cold(lambda ctx: ingest.load_models(ctx.models_csv)))
+case('cold.load_notable')(_cold(lambda ctx: ingest.load_notable(ctx.notable_csv)))
+case('cold.load_emissions')(_cold(lambda ctx: ingest.load_emissions(ctx.emissions_csv)))
+case('cold.emission_runs')(_cold(lambda ctx: stream_runs(ctx.emissions_csv)))
+case('warm.load_models')(_warm(lambda ctx: ingest.load_models(ctx.models_csv)))
+case('warm.load_notable')(_warm(lambda ctx: ingest.load_notable(ctx.notable_csv)))
+case('warm.load_emissions')(_warm(lambda ctx: ingest.load_emissions(ctx.emissions_csv)))
+case('warm.emission_runs')(_warm(lambda ctx: stream_runs(ctx.emissions_csv)))
+
+# the bundled model tables merged into one catalog (catalog.py)
+case('cold.catalog')(_cold(lambda ctx: load_catalog((ctx.models_csv, ctx.notable_csv))))
+case('warm.catalog')(_warm(lambda ctx: load_catalog((ctx.models_csv, ctx.notable_csv))))
+
+case('cold.rollups')(_cold(lambda ctx: RollupStore(ctx.emissions_csv).runs))
+
+
+@case('rollup.query')
+def rollup_query(ctx):
+    # every project at a 300-point budget, answered from the rollup levels
+    store = ctx.memo('rollups', lambda: RollupStore(ctx.emissions_csv))
+    projects = store.projects()
+    def run():
+        series, width = store.series(projects, max_points=300)
+        return {'rows': len(series), 'level_s': width}
+    return None, run
+
+
+@case('merge.emissions_cold')
+def merge_cold(ctx):
+    # fuzzy fallback with an empty match table every time
+    models, em_proj = ctx.models, ctx.em_proj
+    dirs = []
+    def setup():
+        dirs.append(tempfile.mkdtemp(prefix='bench-match-'))
+    def run():
+        return {'rows': len(core.merge_emissions(models, em_proj, cache_dir=dirs[-1]))}
+    return setup, run
+
+
+@case('merge.emissions_warm')
+def merge_warm(ctx):
+    models, em_proj = ctx.models, ctx.em_proj
+    folder = tempfile.mkdtemp(prefix='bench-match-')
+    core.merge_emissions(models, em_proj, cache_dir=folder)
+    return None, lambda: {'rows': len(core.merge_emissions(models, em_proj, cache_dir=folder))}
+
+
+@case('fuzzy.notable_vs_systems')
+def fuzzy_notable(ctx):
+    # a fixed 500 notable names against every system, so the cost grows
+    # with the candidate list only
+    words = ctx.notable['model'].dropna().astype(str).drop_duplicates().iloc[:500].tolist()
+    systems = ctx.models['system'].dropna().astype(str)
+    def run():
+        matched = NameMatcher(systems).match_many(words, cutoff=0.8)
+        return {'rows': len(words), 'matched': sum(m is not None for m in matched)}
+    return None, run
+
+
+@case('build.suggest_engine')
+def build_engine(ctx):
+    merged = ctx.merged
+    return None, lambda: {'rows': len(SuggestEngine(merged, 'bench').task_index.tokens())}
+
+
+@case('build.similar_index')
+def build_similar(ctx):
+    merged = ctx.merged
+    text = ingest.load_model_text(path=ctx.models_csv)['abstract']
+    return None, lambda: {'rows': len(SimilarIndex(merged, text).term_rows)}
+
+
+@case('similar.query')
+def similar_query(ctx):
+    # 100 "like this, but cheaper in energy" lookups spread over the table
+    index = ctx.memo('similar', lambda: SimilarIndex(
+        ctx.merged, ingest.load_model_text(path=ctx.models_csv)['abstract']))
+    rows = np.linspace(0, index.n_rows - 1, 100).astype(int)
+    def run():
+        n = sum(len(index.nearest(r, 10, cheaper_by=DEFAULT_COST)[0]) for r in rows)
+        return {'ops': len(rows), 'rows': n}
+    return None, run
+
+
+def _filter(power=np.inf, params=np.inf, co2=None, q=0.5):
+    def make(ctx):
+        eng, tasks = ctx.engine, ctx.tasks
+        # quantile (default median) limits so the numeric filters cut rows
+        lim = dict(
+            power=float(ctx.merged['training_power_(watts)'].quantile(q)) if power is None else power,
+            params=float(ctx.merged['parameters'].quantile(q) / 1e9) if params is None else params,
+            co2=co2,
+        )
+        def run():
+            # uncached: the function behind SuggestEngine.suggest_positions
+            n = sum(len(suggest_positions(eng.df, eng.task_index, eng.ranker, t, topk=10,
+                                          ranges=eng.ranges, **lim))
+                    for t in tasks)
+            return {'ops': len(tasks), 'rows': n}
+        return None, run
+    return make
+
+
+case('filter.task')(_filter())
+case('filter.task_power')(_filter(power=None))
+case('filter.task_power_params')(_filter(power=None, params=None))
+case('filter.task_power_params_co2')(_filter(power=None, params=None, co2=np.inf))
+# a slider near its low end: the range index drives the query
+case('filter.task_power_p05')(_filter(power=None, q=0.05))
+
+
+@case('domain.build_index')
+def domain_build(ctx):
+    domains = ctx.notable['domain']
+    return None, lambda: {'rows': len(TokenIndex.from_values(domains, sep=r'\s*,\s*').tokens())}
+
+
+@case('domain.lookup')
+def domain_lookup(ctx):
+    index = ctx.memo('domain_index', lambda: TokenIndex.from_values(ctx.notable['domain'], sep=r'\s*,\s*'))
+    domains = index.tokens()
+    def run():
+        n = sum(len(index.get(d)) for d in domains) + len(index.any_of(domains))
+        return {'ops': len(domains) + 1, 'rows': n}
+    return None, run
+
+
+@case('domain.mask_scan')
+def domain_scan(ctx):
+    # the per-rerun str.contains mask the index replaced, for comparison
+    col = ctx.notable['domain'].astype(str)
+    domains = ctx.memo('domain_index', lambda: TokenIndex.from_values(ctx.notable['domain'], sep=r'\s*,\s*')).tokens()
+    def run():
+        n = sum(int(col.str.contains(d, regex=False).sum()) for d in domains)
+        return {'ops': len(domains), 'rows': n}
+    return None, run
+
+
+@case('plot.payload')
+def plot_payload(ctx):
+    df = ctx.notable
+    def run():
+        reduced, mode = reduce_xy(df, 'publication_date', 'parameters', budget=2000)
+        return {
+            'rows': len(reduced), 'mode': mode,
+            'payload_bytes': len(reduced.to_json(orient='records', date_format='iso')),
+            'unreduced_bytes': len(df[['publication_date', 'parameters']].dropna().to_json(orient='records', date_format='iso')),
+        }
+    return None, run
+
+
+# --- runner --------------------------------------------------------------
+
+def measure(setup, run, repeat):
+    times, metrics = [], {}
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        metrics = run() or {}
+        times.append(time.perf_counter() - t0)
+    return times, metrics
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit, 'host': platform.node(), 'python': platform.python_version(),
+        'pandas': pd.__version__, 'numpy': np.__version__,
+    }
+
+
+def load_history(path=RESULTS):
+    if not os.path.exists(path):
+        return []
+    with open(path) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def previous(history, record):
+    # latest earlier run of the same case/scale on the same host
+    for old in reversed(history):
+        if (old['run'] != record['run'] and old['host'] == record['host']
+                and old['case'] == record['case'] and old['scale'] == record['scale']):
+            return old
+    return None
+
+
+def report(records, history, threshold=REGRESSION_RATIO):
+    regressions = []
+    for r in records:
+        old = previous(history, r)
+        change = ''
+        if old is not None:
+            ratio = r['median_s'] / old['median_s'] if old['median_s'] else np.inf
+            change = f"{ratio:5.2f}x vs {old['commit'] or old['run']}"
+            if ratio > threshold and r['median_s'] - old['median_s'] > NOISE_FLOOR_S:
+                change += '  REGRESSION'
+                regressions.append(r)
+        extra = ', '.join(f"{k}={v}" for k, v in r['metrics'].items())
+        print(f"  x{r['scale']:<5} {r['case']:<32} {r['median_s'] * 1e3:10.2f} ms  {change:<28} {extra}")
+    return regressions
+
+
+def run_suite(scales, patterns, repeat, data_dir):
+    env = environment()
+    run_id = time.strftime('%Y-%m-%dT%H:%M:%S')
+    names = [n for n in CASES if any(fnmatch.fnmatch(n, p) for p in patterns)]
+    records = []
+    for scale in scales:
+        ctx = Context(write_scaled(scale, data_dir))
+        for name in names:
+            setup, run = CASES[name](ctx)
+            times, metrics = measure(setup, run, repeat)
+            records.append(dict(env, run=run_id, scale=scale, case=name, repeat=repeat,
+                                median_s=float(np.median(times)), min_s=float(np.min(times)),
+                                metrics=metrics))
+    return records
+
+
+def save(records, path=RESULTS):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as fh:
+        for r in records:
+            fh.write(json.dumps(r) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the load, merge, filter and rank paths.')
+    parser.add_argument('--scale', type=int, action='append', help=f'row multiplier (repeatable, default {DEFAULT_SCALES})')
+    parser.add_argument('--case', action='append', help='glob over case names (repeatable, default all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--data-dir', default=DEFAULT_DIR, help='where the synthetic CSVs are written')
+    parser.add_argument('--results', default=RESULTS)
+    parser.add_argument('--no-save', action='store_true', help='do not append to the history file')
+    parser.add_argument('--compare-only', action='store_true', help='report the latest stored run and exit')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_RATIO)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--list', action='store_true', help='list case names and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(CASES))
+        return 0
+    history = load_history(args.results)
+    if args.compare_only:
+        if not history:
+            print(f"no results in {args.results}")
+            return 0
+        last = history[-1]['run']
+        records = [r for r in history if r['run'] == last]
+    else:
+        records = run_suite(args.scale or DEFAULT_SCALES, args.case or ['*'], args.repeat, args.data_dir)
+        if not args.no_save:
+            save(records, args.results)
+    print(f"run {records[0]['run']} @ {records[0]['commit']} on {records[0]['host']}")
+    regressions = report(records, history, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than {args.threshold}x the previous run")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
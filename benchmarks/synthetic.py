@@ -0,0 +1,79 @@
+# Synthetic scale-ups of the bundled CSVs for the benchmark suite.
+#
+#   python -m benchmarks.synthetic --scale 10 --scale 100
+#
+# Every copy but the first of a source row gets a unique key (a " #<i>"
+# suffix on each key column: the system / model name, the emissions project
+# and run) and its numeric columns are jittered by a seeded +-10 %, so
+# filters, rankings and fuzzy matching see realistic, non-duplicate data. Files keep the source names, so the loaders
+# write their snapshots under <out>/x<scale>/.bass_cache as usual.
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingest
+from snapshot import CACHE_DIR
+
+DEFAULT_DIR = os.path.join(CACHE_DIR, 'synthetic')
+
+# raw CSV key columns that must stay unique per copy
+KEYS = {
+    ingest.MODELS_CSV: ['System'],
+    ingest.NOTABLE_CSV: ['Model'],
+    ingest.EMISSIONS_CSV: ['project_name', 'run_id'],
+}
+# cumulative emissions readings must stay monotonic within a run, so they
+# are scaled per copy rather than jittered per row
+EMISSIONS_SCALED = ['duration', 'emissions', 'cpu_energy', 'gpu_energy', 'ram_energy', 'energy_consumed']
+
+
+def scale_frame(raw, factor, keys, seed=0, per_copy=()):
+    rng = np.random.default_rng(seed)
+    n = len(raw)
+    copy = np.repeat(np.arange(factor), n)
+    out = raw.iloc[np.tile(np.arange(n), factor)].reset_index(drop=True)
+    suffix = pd.Series(copy).map(lambda i: '' if i == 0 else f' #{i}')
+    for key in keys:
+        if key in out.columns:
+            out[key] = out[key].where(out[key].isna(), out[key].astype(str) + suffix)
+    jitter = rng.uniform(0.9, 1.1, size=len(out))
+    jitter[copy == 0] = 1.0
+    copy_jitter = np.r_[1.0, rng.uniform(0.9, 1.1, size=factor - 1)][copy]
+    for col in out.columns:
+        if out[col].dtype.kind == 'f' and col not in keys:
+            out[col] = out[col] * (copy_jitter if col in per_copy else jitter)
+    return out
+
+
+def write_scaled(factor, out_dir=DEFAULT_DIR, sources=tuple(KEYS), seed=0):
+    # -> directory holding the scaled copies; existing files are reused
+    target = os.path.join(out_dir, f'x{factor}')
+    os.makedirs(target, exist_ok=True)
+    for src in sources:
+        dest = os.path.join(target, os.path.basename(src))
+        if os.path.exists(dest):
+            continue
+        raw = pd.read_csv(src)
+        per_copy = EMISSIONS_SCALED if src == ingest.EMISSIONS_CSV else ()
+        scaled = scale_frame(raw, factor, KEYS[src], seed=seed, per_copy=per_copy)
+        tmp = f'{dest}.{os.getpid()}.tmp'
+        scaled.to_csv(tmp, index=False)
+        os.replace(tmp, dest)
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write scaled copies of the bundled CSVs.')
+    parser.add_argument('--scale', type=int, action='append', help='row multiplier (repeatable)')
+    parser.add_argument('-o', '--output', default=DEFAULT_DIR)
+    args = parser.parse_args(argv)
+    for factor in args.scale or [10]:
+        target = write_scaled(factor, args.output)
+        sizes = {f: os.path.getsize(os.path.join(target, f)) for f in sorted(os.listdir(target)) if f.endswith('.csv')}
+        print(f"x{factor}: " + ', '.join(f"{f} {s / 1e6:.1f} MB" for f, s in sizes.items()))
+
+
+if __name__ == '__main__':
+    main()
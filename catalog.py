@@ -0,0 +1,164 @@
+# One model catalog from every model table in the repo.
+#
+# notable_ai_models.csv, large_scale_ai_models_added_cols.csv and
+# cleaned_epoch_ai_models_ready.csv describe overlapping sets of models with
+# differently spelled headers, and used to be cleaned by two normalizers
+# that disagree ('training_power_(watts)' vs 'training_power_draw__w_').
+# Here every source is parsed in its own worker process, its headers mapped
+# onto the fields of the AI models data dictionary (the dictionary's Aliases
+# column lists other sources' spellings), and the rows of all sources are
+# merged into one table:
+#   - a model listed by several sources becomes one row, matched by its
+#     normalized name; each column takes the first value present in source
+#     order (CATALOG_SOURCES), and 'source' lists where the row came from
+#   - missing training energy / carbon are then estimated as for the models
+#     table (estimates.py)
+# Each source's parsed frame is snapshotted on its own and rebuilt through
+# refresh.incremental_build, so an edited row is the only one re-cleaned and
+# unchanged sources are read back from their snapshots. The merge below
+# (dedupe, estimates, schema) then runs over the whole catalog again; it is
+# a few vectorized passes. The result is one snapshot keyed on all sources.
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+import ingest
+import refresh
+from estimates import estimate_missing
+from schema import AI_DICTIONARY_CSV, apply_schema, lazy_columns, load_dictionary
+from snapshot import load_snapshot
+
+EPOCH_CSV = 'cleaned_epoch_ai_models_ready.csv'
+# in priority order: earlier sources win where two disagree
+CATALOG_SOURCES = (ingest.MODELS_CSV, ingest.NOTABLE_CSV, EPOCH_CSV)
+CATALOG_VERSION = 2
+
+NAME_COL = 'system'
+SOURCE_COL = 'source'
+CATALOG_NUMERIC_COLS = ingest.MODEL_NUMERIC_COLS + [
+    'citations', 'carbon_emissions_from_training_(lb)', 'epochs', 'hardware_utilization',
+    'training_compute_cost_(2023_usd)', 'batch_size',
+]
+
+
+def field_names(dictionary=None):
+    # normalized header spelling -> dictionary field, for the field itself
+    # and every alias listed for it
+    if dictionary is None:
+        dictionary = load_dictionary(AI_DICTIONARY_CSV)
+    names = {}
+    aliases = dictionary['aliases'] if 'aliases' in dictionary.columns else pd.Series('', index=dictionary.index)
+    for field, spelled in zip(dictionary['field'], aliases.fillna('')):
+        names[field] = field
+        for alias in filter(None, (a.strip() for a in spelled.split(';'))):
+            names[ingest.normalize_columns(pd.Index([alias]))[0]] = field
+    return names
+
+
+def reconcile_columns(columns, names):
+    # source headers -> catalog names; headers the dictionary does not know
+    # keep their normalized spelling
+    normalized = ingest.normalize_columns(pd.Index(columns))
+    return [names.get(n, n) for n in normalized]
+
+
+def clean_source(df, names, source):
+    # raw rows of one source -> catalog columns and types
+    df.columns = reconcile_columns(df.columns, names)
+    df = df.loc[:, ~df.columns.duplicated()]
+    for col in CATALOG_NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    if 'publication_date' in df.columns:
+        df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
+    df[SOURCE_COL] = source
+    return df
+
+
+def _build_source(path, names):
+    source = os.path.splitext(os.path.basename(path))[0]
+    return refresh.incremental_build(
+        path, 'catalog', NAME_COL, lambda cols: pd.Index(reconcile_columns(cols, names)),
+        partial(clean_source, names=names, source=source), apply_schema, version=_version())
+
+
+def parse_source(path, names):
+    # runs in a worker process: one source CSV as a frame in catalog columns,
+    # plus the refresh.TableDiff when it was rebuilt incrementally (the
+    # worker's refresh.LAST_DIFFS is not the caller's)
+    refresh.LAST_DIFFS.pop(os.path.abspath(path), None)
+    df = load_snapshot(path, 'catalog-source', partial(_build_source, names=names), version=_version())
+    return df, refresh.last_diff(path)
+
+
+def name_keys(names, start=0):
+    # 'GPT-4 (March 2023)' and 'gpt 4 (march 2023)' are the same model;
+    # rows without a name get a key of their own (their position, counted
+    # from start) and are never merged
+    keys = (names.astype('string').str.normalize('NFKD').str.lower()
+            .str.replace(r'[^a-z0-9]+', '', regex=True))
+    unnamed = keys.isna() | (keys == '')
+    fallback = pd.Series(np.arange(start, start + len(names)), index=names.index).astype(str).radd('#')
+    return keys.where(~unnamed, fallback).astype(str)
+
+
+def dedupe(df):
+    # lazy_backend._merge_sql is the same merge in SQL for the DuckDB backend
+    keys = name_keys(df[NAME_COL]).to_numpy()
+    # first non-missing value per column, in source order
+    out = df.groupby(keys, sort=False).first()
+    # the sources of a row as a bit set, so the few distinct combinations
+    # are spelled out once rather than joined per row
+    codes, sources = pd.factorize(df[SOURCE_COL])
+    bits = pd.DataFrame({'key': keys, 'bit': np.left_shift(1, codes)}).drop_duplicates()
+    masks = bits.groupby('key', sort=False)['bit'].sum().reindex(out.index)
+    spelled = {m: ','.join(s for i, s in enumerate(sources) if m >> i & 1) for m in masks.unique()}
+    out[SOURCE_COL] = masks.map(spelled)
+    return out.reset_index(drop=True)
+
+
+def build_catalog(paths=CATALOG_SOURCES):
+    names = field_names()
+    if len(paths) == 1:
+        parts = [parse_source(paths[0], names)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as pool:
+            parts = list(pool.map(parse_source, paths, repeat(names)))
+    for path, (_, diff) in zip(paths, parts):
+        if diff is not None:
+            refresh.LAST_DIFFS[os.path.abspath(path)] = diff
+    parts = [df for df, _ in parts if len(df)]
+    df = pd.concat(parts, ignore_index=True, sort=False)
+    df = dedupe(df)
+    return apply_schema(estimate_missing(df))
+
+
+def _version():
+    return f'{ingest.CLEANER_VERSION}.{CATALOG_VERSION}'
+
+
+def load_catalog(paths=CATALOG_SOURCES):
+    return load_snapshot(tuple(paths), 'catalog', build_catalog,
+                         version=_version(), exclude=lazy_columns)
+
+
+def load_catalog_text(columns=('abstract',), paths=CATALOG_SOURCES):
+    # row-aligned with load_catalog(paths)
+    return load_snapshot(tuple(paths), 'catalog', build_catalog,
+                         version=_version(), columns=list(columns))
+
+
+def catalog_version(paths=CATALOG_SOURCES):
+    return ingest.dataset_version(*paths)
+
+
+def last_changes(paths=CATALOG_SOURCES):
+    # "<source>: +n new, n changed, -n removed" for every source the last
+    # incremental rebuild in this process touched, or None
+    found = [(p, refresh.last_diff(p)) for p in paths]
+    changes = [f"{os.path.splitext(os.path.basename(p))[0]}: {d.summary()}" for p, d in found if d is not None]
+    return '; '.join(changes) or None
@@ -0,0 +1,154 @@
+# Streamlit-free core of the explorer: load, merge, filter and rank.
+#
+# The apps wrap these functions in Streamlit caches; batch jobs and the HTTP
+# service (api.py) use them directly. A Dataset is loaded once per process
+# and shared by all callers; get_dataset() swaps in a fresh one when a
+# source CSV changes. BASS_BACKEND=duckdb serves the same queries from lazy
+# scans of the files instead (lazy_backend.py).
+import os
+import threading
+
+import numpy as np
+
+import ingest
+import profiling
+from catalog import CATALOG_SOURCES, load_catalog, load_catalog_text
+from emissions import summarize_projects
+from estimates import ENERGY_SOURCE_COL, fill_co2
+from name_matching import match_names
+from similar import DEFAULT_COST
+from snapshot import cache_dir_for
+from suggest import CO2_COL, SuggestEngine
+
+SUGGEST_COLUMNS = [
+    'system', 'task', 'training_power_(watts)', 'training_energy_(kwh)',
+    ENERGY_SOURCE_COL, CO2_COL, 'co2_source', 'parameters', 'organization', 'training_compute_(flop)',
+    'training_time_(hours)'
+]
+
+
+def merge_emissions(models_df, em_proj, cache_dir=None):
+    # em_proj: one row per project (run totals summed, see emissions.py) so
+    # the join cannot multiply model rows the way the per-interval log did.
+    # cache_dir holds the fuzzy match table (default: next to the emissions CSV)
+    # Merge on project_name to system
+    if 'project_name' in em_proj.columns and CO2_COL in em_proj.columns:
+        em_proj = em_proj[['project_name', CO2_COL]]
+        with profiling.span('merge.exact'):
+            df = models_df.merge(
+                em_proj, left_on='system', right_on='project_name', how='left'
+            )
+        # Fuzzy fallback for unmatched entries
+        mask = df[CO2_COL].isna()
+        if mask.any():
+            # same best-match-above-0.8 answer as difflib.get_close_matches,
+            # with candidate pruning and a persisted match table
+            with profiling.span('merge.fuzzy', unmatched=int(mask.sum())):
+                df.loc[mask, 'matched_project'] = match_names(
+                    df.loc[mask, 'system'], em_proj['project_name'], cutoff=0.8,
+                    cache_dir=cache_dir or cache_dir_for(ingest.EMISSIONS_CSV)
+                )
+            df = df.merge(
+                em_proj, left_on='matched_project', right_on='project_name',
+                how='left', suffixes=('', '_fuzzy')
+            )
+            # Combine exact and fuzzy
+            df[CO2_COL] = df[CO2_COL].fillna(
+                df.get(CO2_COL + '_fuzzy')
+            )
+        # Clean up
+        to_drop = [col for col in ['project_name', 'project_name_fuzzy', 'matched_project', CO2_COL + '_fuzzy'] if col in df.columns]
+        df = df.drop(columns=to_drop)
+        # models without a matched project fall back to their own
+        # reported or estimated training carbon (estimates.py)
+        return fill_co2(df, CO2_COL)
+    return models_df
+
+
+def load_merged(models_df=None):
+    # model catalog with per-project CO2 totals from the chunked emissions
+    # reader, which only parses rows appended since the last load
+    if models_df is None:
+        models_df = load_catalog()
+    em_proj = summarize_projects(runs=ingest.load_emission_runs())
+    return merge_emissions(models_df, em_proj)
+
+
+class Dataset:
+
+    def __init__(self, models, em_proj, version, text=None):
+        self.models = models
+        self.em_proj = em_proj
+        self.version = version
+        self.engine = SuggestEngine(models, version, text=text)
+
+    @classmethod
+    def load(cls, sources=CATALOG_SOURCES, emissions_csv=ingest.EMISSIONS_CSV, cache_dir=None):
+        version = current_version(sources, emissions_csv)
+        em_proj = summarize_projects(runs=ingest.load_emission_runs(emissions_csv))
+        models = merge_emissions(load_catalog(sources), em_proj, cache_dir=cache_dir)
+        # the merge keeps the models' row order, so the abstracts line up
+        return cls(models, em_proj, version, text=load_catalog_text(paths=sources)['abstract'])
+
+    def tasks(self):
+        return sorted(str(t) for t in self.models['task'].dropna().unique())
+
+    def n_models(self):
+        return len(self.models)
+
+    def suggest(self, task, max_power=None, max_params=None, max_co2=None, topk=5, pareto=False):
+        # same query as the Suggest tab; a missing limit means "no limit"
+        # (rows without a value for that column are still excluded, as the
+        # sliders do). max_params is in billions; pareto restricts the
+        # answer to the task's Pareto skyline (skyline.py)
+        power = np.inf if max_power is None else max_power
+        params = np.inf if max_params is None else max_params
+        return self.engine.suggest(task, power, params, max_co2, topk, pareto)
+
+    def similar(self, system, topk=5, cheaper_by=DEFAULT_COST):
+        # models closest to `system` that are cheaper in cheaper_by (None:
+        # any), with their distance; None when the system is unknown
+        pos = np.flatnonzero(self.models['system'].astype(str).to_numpy() == system)
+        if not len(pos):
+            return None
+        return self.engine.similar(pos[0], topk, cheaper_by)
+
+    def project_emissions(self, projects=None):
+        em = self.em_proj
+        if projects:
+            em = em[em['project_name'].isin(projects)]
+        return em
+
+
+def current_version(sources=CATALOG_SOURCES, emissions_csv=ingest.EMISSIONS_CSV):
+    return ingest.dataset_version(*sources, emissions_csv)
+
+
+def load_dataset(backend=None, sources=CATALOG_SOURCES, emissions_csv=ingest.EMISSIONS_CSV, cache_dir=None):
+    # 'pandas' (default): frames in RAM; 'duckdb': out-of-core scans. Both
+    # serve the model catalog of the given sources (catalog.py)
+    backend = backend or os.environ.get('BASS_BACKEND', 'pandas')
+    if backend == 'duckdb':
+        from lazy_backend import DuckDBDataset
+        return DuckDBDataset(sources, emissions_csv, version=current_version(sources, emissions_csv),
+                             cache_dir=cache_dir)
+    if backend != 'pandas':
+        raise ValueError(f"unknown BASS_BACKEND {backend!r}")
+    return Dataset.load(sources, emissions_csv, cache_dir)
+
+
+_dataset = None
+_dataset_lock = threading.Lock()
+
+
+def get_dataset():
+    # process-wide Dataset, reloaded when a source CSV changes
+    global _dataset
+    version = current_version()
+    ds = _dataset
+    if ds is None or ds.version != version:
+        with _dataset_lock:
+            if _dataset is None or _dataset.version != version:
+                _dataset = load_dataset()
+            ds = _dataset
+    return ds
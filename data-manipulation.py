@@ -2,42 +2,61 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
+import catalog
+import result_view
+from indexes import TokenIndex
+from plot_backend import MAX_POINTS, clip_range, reduce_xy
+from ranking import TopKRanker
+from shared_dataset import shared_frame
+from skyline import MODEL_OBJECTIVES, SkylineIndex
+
 # --- Page config ---
 st.set_page_config(page_title="AI Model Explorer", layout="wide")
 
 # --- Data loading & cleaning ---
-@st.cache_data
-def load_data(path='notable_ai_models.csv'):
-    df = pd.read_csv(path)
-    # normalize column names
-    df.columns = (
-        df.columns
-          .str.strip()
-          .str.lower()
-          .str.replace(r"[ \(\)]", "_", regex=True)
-    )
-    # parse dates
-    if 'publication_date' in df.columns:
-        df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
-    # numeric conversions
-    for col in [
-        'parameters', 'training_compute_flop',
-        'training_dataset_size_datapoints', 'training_power_draw_w',
-        'citations', 'training_time_hours'
-    ]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    # split domain into list
-    if 'domain' in df.columns:
-        df['domain_list'] = df['domain'].str.split(r'\s*,\s*')
-    return df
+# cleaned once per CSV version and published read-only in shared memory;
+# every session and worker attaches to the same buffers. version changes
+# when the CSV changes and keys all the cached resources below.
+@st.cache_resource(max_entries=2)
+def load_data(version):
+    # the model catalog of every source table (catalog.py), shared with the
+    # other apps
+    return shared_frame('catalog', version, catalog.load_catalog)
+
+@st.cache_resource(max_entries=2)
+def domain_index(version):
+    # domain token -> row positions, built once instead of per rerun
+    return TokenIndex.from_values(load_data(version)['domain'], sep=r'\s*,\s*')
+
+@st.cache_resource(max_entries=2)
+def suggest_ranker(version):
+    # rows ranked once by citations (desc) then power draw (asc)
+    return TopKRanker(load_data(version), ['citations', 'training_power_(watts)'], ascending=[False, True])
+
+@st.cache_resource(max_entries=2)
+def domain_skyline(version):
+    # per-domain Pareto skyline (power, energy, parameters, compute,
+    # citations) and the citations order its members are listed in
+    df = load_data(version)
+    return (SkylineIndex(df, MODEL_OBJECTIVES, domain_index(version)),
+            TopKRanker(df, ['citations'], ascending=False))
+
+@st.cache_resource(max_entries=2)
+def result_pages(version):
+    # server-side paging of the displayed columns only (result_view.py)
+    return result_view.ResultView(load_data(version))
 
 # load dataframe
-df = load_data()
+version = catalog.catalog_version()
+df = load_data(version)
+dom_index = domain_index(version)
+if st.session_state.get('data_version') not in (None, version):
+    changes = catalog.last_changes()
+    st.toast("Data updated" + (f": {changes}" if changes else ""))
+st.session_state['data_version'] = version
 
 # auto-detected metric columns
-domain_col = 'domain_list'
-power_col = 'training_power_draw_w'
+power_col = 'training_power_(watts)'
 cite_col = 'citations'
 
 # --- Sidebar navigation ---
@@ -47,22 +66,31 @@ tab = st.sidebar.radio("Navigate to", ["🔍 Suggest", "📊 Plot"])
 if tab == "🔍 Suggest":
     st.header("Model Suggestion by Domain")
     # domain selector
-    domains = sorted({d for lst in df[domain_col].dropna() for d in lst})
+    domains = dom_index.tokens()
     domain = st.selectbox("Select a domain", domains)
     top_k = st.slider("How many suggestions?", 1, 20, 5)
-    # filter by domain
-    mask = df[domain_col].apply(lambda lst: domain in lst if isinstance(lst, list) else False)
-    df_dom = df[mask]
-    # require both citations and power
-    if power_col in df_dom.columns and cite_col in df_dom.columns:
-        df_dom = df_dom.dropna(subset=[power_col, cite_col])
-        df_dom = df_dom.sort_values(by=[cite_col, power_col], ascending=[False, True])
-    suggestions = df_dom.head(top_k)
-    if not suggestions.empty:
-        display = ['model', 'organization', 'publication_date', cite_col]
-        if power_col in suggestions.columns:
+    pareto = st.radio(
+        "Ranking", ["Most cited", "Pareto trade-offs"], horizontal=True,
+        help="Pareto: only models no other model in the domain beats on power, energy, parameters, compute and citations at once"
+    ) == "Pareto trade-offs"
+    if pareto:
+        sky, by_citations = domain_skyline(version)
+        pos = by_citations.top_k(sky.get(domain), top_k)
+    else:
+        # filter by domain
+        pos = dom_index.get(domain)
+        # require both citations and power
+        if power_col in df.columns and cite_col in df.columns:
+            pos = pos[pd.notna(df[power_col].to_numpy()[pos]) & pd.notna(df[cite_col].to_numpy()[pos])]
+            pos = suggest_ranker(version).top_k(pos, top_k)
+    pos = pos[:top_k]
+    if len(pos):
+        display = ['system', 'organization', 'publication_date', cite_col]
+        if power_col in df.columns:
             display.append(power_col)
-        st.table(suggestions[display])
+        if pareto:
+            display += [c for c, _ in MODEL_OBJECTIVES if c in df.columns and c not in display]
+        result_view.show(result_pages(version), pos, display, key='suggestions', sortable=False)
     else:
         st.warning("No models match your criteria.")
 
@@ -70,10 +98,9 @@ if tab == "🔍 Suggest":
 else:
     st.header("Custom Plot Explorer")
     # domain filter
-    domains = sorted({d for lst in df[domain_col].dropna() for d in lst})
+    domains = dom_index.tokens()
     selected = st.multiselect("Filter by domain (optional)", domains, default=domains)
-    mask = df[domain_col].apply(lambda lst: any(d in lst for d in selected) if isinstance(lst, list) else False)
-    df_plot = df[mask]
+    df_plot = df.iloc[dom_index.any_of(selected)]
     # choose axes
     numeric_date = [
         c for c in df_plot.columns
@@ -86,17 +113,36 @@ else:
     y_choices = [c for c in numeric_date if c != x_col]
     y_col = st.selectbox("Y axis", y_choices)
     df_xy = df_plot[[x_col, y_col]].dropna()
+    # reduce on the server so the page only receives a bounded payload
+    with st.expander("Range & point budget"):
+        if len(df_xy) and df_xy[x_col].min() < df_xy[x_col].max():
+            lo, hi = df_xy[x_col].min(), df_xy[x_col].max()
+            if pd.api.types.is_datetime64_any_dtype(df_xy[x_col]):
+                lo, hi = lo.to_pydatetime(), hi.to_pydatetime()
+            else:
+                lo, hi = float(lo), float(hi)
+            x_lo, x_hi = st.slider("Visible X range", lo, hi, (lo, hi))
+            df_xy = clip_range(df_xy, x_col, x_lo, x_hi)
+        budget = st.slider("Max points sent to the chart", 100, MAX_POINTS, 2000, step=100)
+        mode = st.selectbox("Reduction", ["auto", "points", "lttb", "bins"])
+    df_xy, used = reduce_xy(df_xy, x_col, y_col, budget, mode)
     x_type = 'temporal' if pd.api.types.is_datetime64_any_dtype(df_xy[x_col]) else 'quantitative'
     y_type = 'temporal' if pd.api.types.is_datetime64_any_dtype(df_xy[y_col]) else 'quantitative'
+    encoding = dict(
+        x=alt.X(x_col, type=x_type, title=x_col.replace('_', ' ').title()),
+        y=alt.Y(y_col, type=y_type, title=y_col.replace('_', ' ').title()),
+        tooltip=[x_col, y_col]
+    )
+    if used == 'bins':
+        # one circle per non-empty cell, sized by how many models it holds
+        encoding['size'] = alt.Size('count', type='quantitative', title='Models')
+        encoding['tooltip'] = [x_col, y_col, 'count']
     chart = (
         alt.Chart(df_xy)
-           .mark_circle(size=60)
-           .encode(
-               x=alt.X(x_col, type=x_type, title=x_col.replace('_', ' ').title()),
-               y=alt.Y(y_col, type=y_type, title=y_col.replace('_', ' ').title()),
-               tooltip=[x_col, y_col]
-           )
+           .mark_circle(**({} if used == 'bins' else {'size': 60}))
+           .encode(**encoding)
            .interactive()
     )
     st.altair_chart(chart, use_container_width=True)
- 
\ No newline at end of file
+    if used != 'points':
+        st.caption(f"Showing {len(df_xy)} {'bins' if used == 'bins' else 'points'} ({used}) reduced on the server.")
@@ -0,0 +1,214 @@
+# Aggregation of the CodeCarbon-style bloom emissions log.
+#
+# bloom_emissions.csv holds one row per tracking interval, and duration,
+# emissions and the energy columns are cumulative within a run. Joining the
+# raw log onto the models table therefore multiplies each matched model by
+# the number of intervals; these helpers collapse the log to one row per run
+# and one row per project first.
+#
+# stream_runs() builds the same per-run table without holding the log in
+# memory: it reads only the needed columns in chunks, folds each chunk into
+# running per-run aggregates, and persists them with the byte offset it
+# stopped at, so a later call only parses rows appended since.
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from snapshot import cache_dir_for, feather, read_snapshot, write_snapshot
+
+EMISSIONS_COL = 'carbon_emissions_(kg_co2)'
+
+# cumulative counters: the run total is the largest value seen
+CUMULATIVE_COLS = [
+    'duration', EMISSIONS_COL, 'energy_consumed',
+    'cpu_energy', 'gpu_energy', 'ram_energy'
+]
+
+
+def summarize_runs(em):
+    # one row per (project_name, run_id) with the run's final totals
+    keys = [c for c in ['project_name', 'run_id'] if c in em.columns]
+    cols = [c for c in CUMULATIVE_COLS if c in em.columns]
+    grouped = em.groupby(keys, sort=True, dropna=False)
+    runs = grouped[cols].max()
+    runs['n_records'] = grouped.size()
+    if 'timestamp' in em.columns:
+        runs['first_timestamp'] = grouped['timestamp'].min()
+        runs['last_timestamp'] = grouped['timestamp'].max()
+    return runs.reset_index()
+
+
+def summarize_projects(em=None, runs=None):
+    # one row per project_name: run totals summed across the project's runs
+    if runs is None:
+        runs = summarize_runs(em)
+    cols = [c for c in CUMULATIVE_COLS if c in runs.columns]
+    grouped = runs.dropna(subset=['project_name']).groupby('project_name', sort=True, observed=True)
+    # min_count=1 keeps a project NaN when none of its runs logged a value
+    projects = grouped[cols].sum(min_count=1)
+    projects['n_runs'] = grouped.size()
+    return projects.reset_index()
+
+
+# --- Streaming, resumable aggregation ---
+# raw log columns read by the streaming loader (everything else is skipped)
+STREAM_COLS = [
+    'timestamp', 'project_name', 'run_id', 'country_name', 'duration',
+    'emissions', 'energy_consumed', 'cpu_energy', 'gpu_energy', 'ram_energy'
+]
+CATEGORY_COLS = ['project_name', 'run_id', 'country_name']
+RUN_KEYS = ['project_name', 'run_id']
+STREAM_STATE_VERSION = 1
+
+
+class _ByteRange(io.RawIOBase):
+    # read-only view of f up to byte `end`, so a row still being appended
+    # past the last newline is never parsed
+
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        n = min(len(buf), self.end - self.f.tell())
+        if n <= 0:
+            return 0
+        data = self.f.read(n)
+        buf[:len(data)] = data
+        return len(data)
+
+
+def _last_newline_end(f, size):
+    # offset just past the final b'\n' in the file (0 if there is none)
+    pos = size
+    while pos > 0:
+        step = min(1 << 16, pos)
+        f.seek(pos - step)
+        block = f.read(step)
+        i = block.rfind(b'\n')
+        if i >= 0:
+            return pos - step + i + 1
+        pos -= step
+    return 0
+
+
+def _tail_digest(f, offset):
+    # identifies the already-consumed prefix: if these bytes change the file
+    # was rewritten, not appended to, and the state must be rebuilt
+    f.seek(max(0, offset - 4096))
+    return hashlib.sha1(f.read(min(offset, 4096))).hexdigest()
+
+
+def _chunk_runs(chunk):
+    # compact per-chunk aggregate with the same columns as the running state
+    for col in chunk.columns.difference(CATEGORY_COLS + ['timestamp']):
+        # float32 is plenty for the reading itself; sums stay float64
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(np.float32)
+    chunk = chunk.rename(columns={'emissions': EMISSIONS_COL})
+    cols = [c for c in CUMULATIVE_COLS if c in chunk.columns]
+    grouped = chunk.groupby(RUN_KEYS, sort=False, dropna=False, observed=True)
+    runs = grouped[cols].max().astype(np.float64)
+    runs['n_records'] = grouped.size()
+    runs['first_timestamp'] = grouped['timestamp'].min()
+    runs['last_timestamp'] = grouped['timestamp'].max()
+    if 'country_name' in chunk.columns:
+        runs['country_name'] = grouped['country_name'].last()
+    return runs
+
+
+def _fold(state, runs):
+    if state is None:
+        return runs
+    both = pd.concat([state, runs])
+    grouped = both.groupby(level=RUN_KEYS, sort=False, dropna=False)
+    agg = {c: 'max' for c in CUMULATIVE_COLS if c in both.columns}
+    agg.update(n_records='sum', first_timestamp='min', last_timestamp='max')
+    if 'country_name' in both.columns:
+        agg['country_name'] = 'last'
+    return grouped.agg(agg)
+
+
+def _read_state(state_path, meta_path):
+    if feather is None or not (os.path.exists(state_path) and os.path.exists(meta_path)):
+        return None, None
+    try:
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        state = read_snapshot(state_path).set_index(RUN_KEYS)
+    except (OSError, ValueError, KeyError):
+        return None, None
+    if meta.get('version') != STREAM_STATE_VERSION:
+        return None, None
+    return state, meta
+
+
+def _write_state(state, meta, state_path, meta_path):
+    if feather is None:
+        return
+    try:
+        write_snapshot(state.reset_index(), state_path)
+        tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, meta_path)
+    except OSError:
+        pass
+
+
+def stream_runs(path, chunksize=100_000, state_dir=None):
+    # per-run totals (same shape as summarize_runs) for the log at `path`,
+    # parsing only bytes added since the previous call
+    state_dir = state_dir or cache_dir_for(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    state_path = os.path.join(state_dir, f"{stem}.runs.arrow")
+    meta_path = os.path.join(state_dir, f"{stem}.runs.json")
+    state, meta = _read_state(state_path, meta_path)
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = _last_newline_end(f, size)
+        f.seek(0)
+        header_line = f.readline()
+        header = [c.strip() for c in header_line.decode('utf-8').rstrip('\r\n').split(',')]
+        offset = len(header_line)
+        if (meta is not None and meta['header'] == header
+                and meta['offset'] <= end
+                and _tail_digest(f, meta['offset']) == meta['tail_digest']):
+            offset = meta['offset']
+        else:
+            state = None
+
+        if offset < end:
+            f.seek(offset)
+            usecols = [c for c in STREAM_COLS if c in header]
+            reader = pd.read_csv(
+                io.BufferedReader(_ByteRange(f, end)),
+                header=None, names=header, usecols=usecols,
+                dtype={c: 'category' for c in CATEGORY_COLS if c in usecols} | {'timestamp': str},
+                chunksize=chunksize,
+            )
+            for chunk in reader:
+                state = _fold(state, _chunk_runs(chunk))
+            meta = {
+                'version': STREAM_STATE_VERSION,
+                'header': header,
+                'offset': end,
+                'tail_digest': _tail_digest(f, end),
+            }
+            _write_state(state, meta, state_path, meta_path)
+
+    if state is None:
+        return pd.DataFrame(columns=RUN_KEYS + CUMULATIVE_COLS + ['n_records'])
+    runs = state.reset_index().sort_values(RUN_KEYS, kind='stable', ignore_index=True)
+    runs['n_records'] = runs['n_records'].astype(np.int64)
+    for col in ['project_name', 'country_name']:
+        if col in runs.columns:
+            runs[col] = runs[col].astype('category')
+    return runs
@@ -0,0 +1,151 @@
+# Estimated training energy and carbon for models that do not report them.
+#
+# Most rows of large_scale_ai_models_added_cols.csv have no training energy
+# or carbon figure. Where they are missing, we fill them from whatever the
+# row does report, in this order:
+#   energy  'power_time'         training power (W, whole run) x training time
+#           'hardware_time'      per-chip TDP x hardware quantity x training time
+#           'compute_hardware'   training compute / (chip FLOP/s per W x utilization)
+#   carbon  'grid_intensity'     energy x grid intensity of the organization's country
+# Reported values are kept and flagged 'reported'; the *_source columns say
+# where every number came from. Everything is a whole-column numpy pass, so
+# it runs inside the cleaner (ingest.clean_models) and lands in the snapshot.
+import numpy as np
+import pandas as pd
+
+POWER_COL = 'training_power_(watts)'
+TIME_COL = 'training_time_(hours)'
+QUANTITY_COL = 'hardware_quantity'
+COMPUTE_COL = 'training_compute_(flop)'
+HARDWARE_COL = 'training_hardware'
+COUNTRY_COL = 'country_(from_organization)'
+ENERGY_COL = 'training_energy_(kwh)'
+CARBON_LB_COL = 'carbon_emissions_from_training_(lb)'
+ENERGY_SOURCE_COL = 'training_energy_source'
+CARBON_SOURCE_COL = 'carbon_emissions_source'
+
+LB_PER_KG = 2.20462
+J_PER_KWH = 3.6e6
+
+# accelerator -> (peak dense 16-bit FLOP/s, TDP in W), from vendor datasheets.
+# Keys are matched as substrings of training_hardware; longer keys first so
+# 'H100 PCIe' wins over 'H100'.
+HARDWARE = {
+    'H100 PCIe': (756e12, 350),
+    'H100': (989e12, 700),
+    'H800': (989e12, 700),
+    'A100 PCIe': (312e12, 250),
+    'A100': (312e12, 400),
+    'A800': (312e12, 400),
+    'V100': (125e12, 300),
+    'RTX 2080 Ti': (108e12, 250),
+    'TPU v5p': (459e12, 450),
+    'TPU v5e': (197e12, 200),
+    'TPU v4': (275e12, 192),
+    'TPU v3': (123e12, 220),
+    'TPU v2': (46e12, 280),
+    'MI250X': (383e12, 560),
+    'MI300X': (1307e12, 750),
+    'Ascend 910': (320e12, 310),
+}
+# share of peak FLOP/s sustained over a training run
+UTILIZATION = 0.4
+
+# country -> grid carbon intensity in kg CO2 / kWh (approximate recent
+# national averages); unknown and multinational organizations get WORLD
+GRID_INTENSITY = {
+    'United States of America': 0.37,
+    'China': 0.58,
+    'Korea (Republic of)': 0.44,
+    'France': 0.06,
+    'United Kingdom of Great Britain and Northern Ireland': 0.21,
+    'Japan': 0.47,
+    'Russia': 0.36,
+    'United Arab Emirates': 0.42,
+    'Canada': 0.13,
+    'Germany': 0.38,
+    'Hong Kong': 0.70,
+    'Israel': 0.55,
+    'Finland': 0.08,
+    'India': 0.71,
+    'Singapore': 0.41,
+    'Taiwan': 0.56,
+    'Switzerland': 0.03,
+    'Netherlands': 0.33,
+    'Sweden': 0.04,
+}
+WORLD_GRID_INTENSITY = 0.48
+
+
+def _column(df, col):
+    if col in df.columns:
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    return np.full(len(df), np.nan)
+
+
+def _first_listed(df, col):
+    # multi-valued cells ("A,B") use their first entry
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    return df[col].astype('string').str.split(',').str[0].str.strip()
+
+
+def hardware_specs(hardware):
+    # -> (peak FLOP/s, TDP W) arrays aligned with the hardware strings;
+    # NaN where the chip is not in HARDWARE
+    pattern = '(' + '|'.join(k.replace(' ', r'\s*') for k in HARDWARE) + ')'
+    found = hardware.str.extract(pattern, expand=False)
+    keys = {k.replace(' ', ''): k for k in HARDWARE}
+    found = found.str.replace(r'\s+', '', regex=True).map(keys)
+    flops = found.map({k: v[0] for k, v in HARDWARE.items()})
+    tdp = found.map({k: v[1] for k, v in HARDWARE.items()})
+    return flops.to_numpy(dtype=np.float64, na_value=np.nan), tdp.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def grid_intensity(country):
+    return country.map(GRID_INTENSITY).astype('Float64').fillna(WORLD_GRID_INTENSITY).to_numpy(dtype=np.float64)
+
+
+def _fill(value, source, candidate, label):
+    take = np.isnan(value) & ~np.isnan(candidate)
+    value[take] = candidate[take]
+    source[take] = label
+
+
+def estimate_missing(df):
+    # fills ENERGY_COL and CARBON_LB_COL in place where missing and adds the
+    # *_source provenance columns; df is a cleaned models frame
+    power, hours = _column(df, POWER_COL), _column(df, TIME_COL)
+    quantity, compute = _column(df, QUANTITY_COL), _column(df, COMPUTE_COL)
+    flops, tdp = hardware_specs(_first_listed(df, HARDWARE_COL))
+
+    energy = _column(df, ENERGY_COL)
+    energy_src = np.where(np.isnan(energy), None, 'reported').astype(object)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        _fill(energy, energy_src, power * hours / 1e3, 'power_time')
+        _fill(energy, energy_src, tdp * quantity * hours / 1e3, 'hardware_time')
+        _fill(energy, energy_src, compute / (flops / tdp * UTILIZATION) / J_PER_KWH, 'compute_hardware')
+
+    carbon = _column(df, CARBON_LB_COL)
+    carbon_src = np.where(np.isnan(carbon), None, 'reported').astype(object)
+    country = _first_listed(df, COUNTRY_COL)
+    _fill(carbon, carbon_src, energy * grid_intensity(country) * LB_PER_KG, 'grid_intensity')
+
+    df[ENERGY_COL] = energy
+    df[CARBON_LB_COL] = carbon
+    df[ENERGY_SOURCE_COL] = pd.Series(energy_src, index=df.index, dtype='str')
+    df[CARBON_SOURCE_COL] = pd.Series(carbon_src, index=df.index, dtype='str')
+    return df
+
+
+def fill_co2(df, co2_col):
+    # co2_col (kg) from the emissions log where matched, else the model's own
+    # reported / estimated training carbon; co2_source records which
+    if CARBON_LB_COL not in df.columns or CARBON_SOURCE_COL not in df.columns:
+        return df
+    measured = df[co2_col].notna() if co2_col in df.columns else pd.Series(False, index=df.index)
+    own = df[CARBON_LB_COL].astype(np.float64) / LB_PER_KG
+    df[co2_col] = df[co2_col].where(measured, own) if co2_col in df.columns else own
+    source = df[CARBON_SOURCE_COL].astype(object).where(df[CARBON_SOURCE_COL].notna(), None)
+    df['co2_source'] = pd.Series(np.where(measured, 'emissions_log', source), index=df.index, dtype='str')
+    return df
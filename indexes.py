@@ -0,0 +1,131 @@
+# Precomputed row-position indexes over the cleaned frames.
+#
+# Streamlit reruns the whole script on every widget change, so filters that
+# scan every row (str.contains, apply with a lambda) are paid again and again.
+# These indexes are built once per loaded frame and turn the filter step into
+# array lookups plus set union/intersection over row positions: TokenIndex for
+# label filters, RangeIndex for numeric limits (the sliders).
+import numpy as np
+import pandas as pd
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+# how much dearer a row is when the query starts from a range
+RANGE_DRIVE_COST = 4
+
+
+class TokenIndex:
+    # token -> sorted int64 array of row positions (iloc positions)
+
+    def __init__(self, postings, n_rows):
+        self.postings = postings
+        self.n_rows = n_rows
+        self._lower = {tok: tok.lower() for tok in postings}
+        self._contains_cache = {}
+
+    @classmethod
+    def from_values(cls, values, sep=None):
+        # values: Series of strings; sep: optional regex to split multi-valued
+        # cells (e.g. "Language,Vision") into separate tokens
+        values = pd.Series(np.asarray(values, dtype=object))
+        n_rows = len(values)
+        if sep is not None:
+            values = values.str.split(sep).explode()
+        values = values.dropna()
+        positions = values.index.to_numpy(dtype=np.int64)
+        codes, uniques = pd.factorize(values.astype(str))
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+        groups = np.split(positions[order], bounds)
+        # a cell may repeat a token ("Chat,Chat"); keep each row once
+        postings = {tok: np.unique(pos) for tok, pos in zip(uniques, groups)}
+        return cls(postings, n_rows)
+
+    def tokens(self):
+        return sorted(self.postings)
+
+    def get(self, token):
+        return self.postings.get(token, EMPTY)
+
+    def any_of(self, tokens):
+        parts = [self.postings[t] for t in tokens if t in self.postings]
+        if not parts:
+            return EMPTY
+        if len(parts) == 1:
+            return parts[0]
+        return np.unique(np.concatenate(parts))
+
+    def all_of(self, tokens):
+        result = None
+        for t in tokens:
+            pos = self.get(t)
+            result = pos if result is None else np.intersect1d(result, pos, assume_unique=True)
+        return EMPTY if result is None else result
+
+    def tokens_containing(self, text):
+        key = text.lower()
+        return [t for t, low in self._lower.items() if key in low]
+
+    def containing(self, text):
+        # case-insensitive substring match against whole tokens, i.e. the
+        # rows Series.str.contains(text, case=False, regex=False) would keep;
+        # scans the distinct tokens, not the rows, and is memoized per text
+        key = text.lower()
+        hit = self._contains_cache.get(key)
+        if hit is None:
+            hit = self.any_of(self.tokens_containing(text))
+            self._contains_cache[key] = hit
+        return hit
+
+
+
+class RangeIndex:
+    # one numeric column as row positions sorted by value, so "value <= x"
+    # is a binary search: the rows passing are a prefix of `order`
+
+    def __init__(self, values):
+        values = np.asarray(pd.to_numeric(pd.Series(values), errors='coerce'), dtype=np.float64)
+        known = np.flatnonzero(~np.isnan(values))
+        self.order = known[np.argsort(values[known], kind='stable')]
+        self.sorted = values[self.order]
+        # position of each row in `order`; missing values rank past every
+        # prefix, as NaN <= x is False
+        self.rank = np.full(len(values), len(self.order), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(self.order))
+
+    def cut(self, limit):
+        # number of rows with value <= limit
+        return int(np.searchsorted(self.sorted, limit, side='right'))
+
+    def at_most(self, limit):
+        # positions of the rows with value <= limit, in value order
+        return self.order[:self.cut(limit)]
+
+
+def contains_sorted(sorted_positions, positions):
+    # mask over positions: which of them are in sorted_positions
+    if not len(sorted_positions):
+        return np.zeros(len(positions), dtype=bool)
+    i = np.searchsorted(sorted_positions, positions)
+    return sorted_positions[np.minimum(i, len(sorted_positions) - 1)] == positions
+
+
+def filter_ranges(candidates, ranges, limits):
+    # candidates (sorted positions) whose value in every ranges[col] is <=
+    # limits[col]. The query starts from whichever side is smallest, the
+    # candidates or the rows under one of the limits (binary search), and
+    # checks the other predicates against just those rows, so its cost
+    # follows the most selective predicate rather than the table size
+    cuts = {col: ranges[col].cut(limit) for col, limit in limits.items()}
+    driver = min(cuts, key=cuts.get, default=None)
+    # a row reached through a range costs a binary search into the
+    # candidates plus a sort, a candidate only a lookup per predicate
+    if driver is None or cuts[driver] * RANGE_DRIVE_COST >= len(candidates):
+        driver, pos = None, candidates
+    else:
+        pos = ranges[driver].order[:cuts[driver]]
+        pos = np.sort(pos[contains_sorted(candidates, pos)])
+    for col, cut in cuts.items():
+        if col != driver:
+            pos = pos[ranges[col].rank[pos] < cut]
+    return pos
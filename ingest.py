@@ -0,0 +1,121 @@
+# Shared loading and cleaning for the model and emissions tables.
+#
+# Both Streamlit apps and the report scripts go through these loaders so the
+# parse + clean work is done once per source file version (see snapshot.py).
+import pandas as pd
+
+from emissions import stream_runs
+from estimates import estimate_missing
+from refresh import incremental_build
+from schema import apply_schema, lazy_columns
+from snapshot import load_snapshot, source_fingerprint
+
+MODELS_CSV = 'large_scale_ai_models_added_cols.csv'
+NOTABLE_CSV = 'notable_ai_models.csv'
+EMISSIONS_CSV = 'bloom_emissions.csv'
+
+# bump when a cleaner changes so old snapshots are rebuilt
+CLEANER_VERSION = 3
+
+MODEL_NUMERIC_COLS = [
+    'training_power_(watts)', 'training_energy_(kwh)', 'parameters',
+    'training_compute_(flop)', 'training_dataset_size_(datapoints)',
+    'training_time_(hours)', 'hardware_quantity', 'finetune_compute_(flop)'
+]
+
+NOTABLE_NUMERIC_COLS = [
+    'parameters', 'training_compute_flop',
+    'training_dataset_size_datapoints', 'training_power_draw_w',
+    'citations', 'training_time_hours'
+]
+
+
+def normalize_columns(columns):
+    return columns.str.strip().str.lower().str.replace(' ', '_')
+
+
+def normalize_columns_regex(columns):
+    return columns.str.strip().str.lower().str.replace(r"[ \(\)]", "_", regex=True)
+
+
+# --- Cleaners (CSV -> typed frame) ---
+def clean_models(df):
+    df.columns = normalize_columns(df.columns)
+    for c in MODEL_NUMERIC_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors='coerce')
+    if 'publication_date' in df.columns:
+        df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
+    # fill missing training energy / carbon from the row's other figures
+    return estimate_missing(df)
+
+
+def clean_emissions(em):
+    em.columns = normalize_columns(em.columns)
+    if 'emissions' in em.columns:
+        em = em.rename(columns={'emissions': 'carbon_emissions_(kg_co2)'})
+    if 'carbon_emissions_(kg_co2)' in em.columns:
+        em['carbon_emissions_(kg_co2)'] = pd.to_numeric(em['carbon_emissions_(kg_co2)'], errors='coerce')
+    return em
+
+
+def clean_notable(df):
+    df.columns = normalize_columns_regex(df.columns)
+    if 'publication_date' in df.columns:
+        df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
+    for col in NOTABLE_NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+# --- Snapshot-backed loaders ---
+# the snapshots hold the compact schema (schema.py); long free-text columns
+# stay on disk until a view asks for them via load_*_text. A changed CSV only
+# re-cleans the rows that differ from the previous version (refresh.py)
+def _build_models(path):
+    return incremental_build(path, 'models', 'system', normalize_columns,
+                             clean_models, apply_schema, version=CLEANER_VERSION)
+
+
+def _build_notable(path):
+    return incremental_build(path, 'notable', 'model', normalize_columns_regex,
+                             clean_notable, apply_schema, version=CLEANER_VERSION)
+
+
+def load_models(path=MODELS_CSV):
+    return load_snapshot(path, 'models', _build_models,
+                         version=CLEANER_VERSION, exclude=lazy_columns)
+
+
+def load_model_text(columns=('abstract',), path=MODELS_CSV):
+    # row-aligned with load_models(path)
+    return load_snapshot(path, 'models', _build_models,
+                         version=CLEANER_VERSION, columns=list(columns))
+
+
+def load_emissions(path=EMISSIONS_CSV):
+    return load_snapshot(path, 'emissions', lambda p: clean_emissions(pd.read_csv(p)),
+                         version=CLEANER_VERSION)
+
+
+def load_notable(path=NOTABLE_CSV):
+    return load_snapshot(path, 'notable', _build_notable,
+                         version=CLEANER_VERSION, exclude=lazy_columns)
+
+
+def load_notable_text(columns=('abstract',), path=NOTABLE_CSV):
+    # row-aligned with load_notable(path)
+    return load_snapshot(path, 'notable', _build_notable,
+                         version=CLEANER_VERSION, columns=list(columns))
+
+
+def load_emission_runs(path=EMISSIONS_CSV):
+    # per-run totals via the chunked, resumable reader (see emissions.py)
+    return stream_runs(path)
+
+
+def dataset_version(*paths):
+    # cheap (stat-only) token that changes whenever any source CSV changes;
+    # pass it to cached loaders so a new file version misses the caches
+    return f"c{CLEANER_VERSION}-" + '-'.join(source_fingerprint(p) for p in paths)
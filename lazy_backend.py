@@ -0,0 +1,380 @@
+# Out-of-core query backend: DuckDB scans instead of frames held in RAM.
+#
+#   BASS_BACKEND=duckdb uvicorn api:app
+#
+# core.Dataset loads the cleaned models table, the emissions totals and the
+# merged frame into pandas, which caps the data at what fits in memory.
+# DuckDBDataset answers the same queries (tasks, suggest, project_emissions)
+# from lazy scans of files on disk:
+#   - the model catalog (catalog.py), the same table the pandas backend
+#     serves, is built once per source version straight from the source
+#     CSVs into a Parquet file, chunk by chunk with the merge done in DuckDB
+#     (see build_catalog_parquet); queries scan it with filter pushdown, so
+#     only the row groups and columns a query needs are read
+#   - per-project emission totals are aggregated by DuckDB straight from the
+#     log (CSV or Parquet), with the same per-run max / per-project sum as
+#     emissions.summarize_runs / summarize_projects
+#   - the exact + fuzzy name join and the CO2 fallback of core.merge_emissions
+#     become a SQL view; only the distinct unmatched system names are pulled
+#     into Python for name_matching
+#   - filters and the power/parameters top-k run as one ORDER BY ... LIMIT
+# The pandas Dataset stays the default; benchmarks/parity.py checks that both
+# backends, as core.load_dataset builds them, return the same answers.
+import hashlib
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+import ingest
+from catalog import (CATALOG_SOURCES, CATALOG_VERSION, NAME_COL, SOURCE_COL, catalog_version,
+                     clean_source, field_names, name_keys)
+from emissions import CUMULATIVE_COLS, EMISSIONS_COL
+from estimates import (CARBON_LB_COL, CARBON_SOURCE_COL, ENERGY_COL, ENERGY_SOURCE_COL, LB_PER_KG,
+                       estimate_missing)
+from name_matching import match_names
+from refresh import BOOL_OBJECT, CSV_BOOLS
+from schema import lazy_columns
+from skyline import MODEL_OBJECTIVES, objective_ranks, skyline
+from snapshot import cache_dir_for
+from suggest import CO2_COL, PARAMS_COL, POWER_COL
+
+try:
+    import duckdb
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional; only needed with BASS_BACKEND=duckdb
+    duckdb = None
+
+ROW_COL = '__row__'
+PARQUET_VERSION = 3
+
+# raw emissions log column -> cleaned name (ingest.clean_emissions)
+EMISSIONS_SOURCE_COLS = {'emissions': EMISSIONS_COL}
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _lit(path):
+    return "'" + os.path.abspath(path).replace("'", "''") + "'"
+
+
+def _scan(path):
+    # table function reading a CSV or Parquet file lazily
+    lit = _lit(path)
+    if path.endswith('.parquet'):
+        return f'read_parquet({lit})'
+    return f'read_csv({lit}, header=true, all_varchar=true)'
+
+
+# --- model catalog -------------------------------------------------------------
+# The catalog is built here from the source CSVs without ever holding it in
+# pandas: each source is read in chunks of CHUNK_ROWS, cleaned with
+# catalog.clean_source and written to a Parquet part together with its name
+# key and position. DuckDB then merges the parts as catalog.dedupe does
+# (first non-missing value per column in source order, sources as a bit
+# set, rows in order of first appearance), spilling to disk if the GROUP BY
+# outgrows memory, and the merged rows come back batch by batch for
+# estimate_missing on their way into the final Parquet file.
+CHUNK_ROWS = 100_000
+KEY_COL, SRC_COL, ORD_COL = '__key__', '__src__', '__ord__'
+
+
+def _kind(values):
+    if values.empty:
+        return 'empty'
+    if values.isin(list(CSV_BOOLS)).all():
+        return 'bool'
+    num = pd.to_numeric(values, errors='coerce')
+    if num.isna().any():
+        return 'str'
+    return 'int' if pd.api.types.is_integer_dtype(num) else 'float'
+
+
+def _merge_kind(a, b):
+    if a == 'empty' or a == b:
+        return b
+    if b == 'empty':
+        return a
+    return 'float' if {a, b} == {'int', 'float'} else 'str'
+
+
+def csv_dtypes(path, chunksize=CHUNK_ROWS):
+    # the dtype pd.read_csv(path) infers for each column, found in a pass
+    # over the file as strings, so all chunks of the real read are typed
+    # alike. Booleans with gaps come back as BOOL_OBJECT
+    kinds, gaps = {}, {}
+    for chunk in pd.read_csv(path, dtype=str, chunksize=chunksize):
+        for col in chunk.columns:
+            values = chunk[col].dropna()
+            kinds[col] = _merge_kind(kinds.get(col, 'empty'), _kind(values))
+            gaps[col] = gaps.get(col, False) or len(values) < len(chunk)
+    dtypes = {}
+    for col, kind in kinds.items():
+        if kind == 'bool':
+            dtypes[col] = BOOL_OBJECT if gaps[col] else 'bool'
+        elif kind == 'int' and not gaps[col]:
+            dtypes[col] = 'int64'
+        elif kind in ('int', 'float', 'empty'):
+            dtypes[col] = 'float64'
+        else:
+            dtypes[col] = 'str'
+    return dtypes
+
+
+def read_chunks(path, chunksize=CHUNK_ROWS):
+    # pd.read_csv(path) in chunks, each typed as the whole file would be
+    dtypes = csv_dtypes(path, chunksize)
+    flags = [c for c, d in dtypes.items() if d == BOOL_OBJECT]
+    read = {c: object if d == BOOL_OBJECT else d for c, d in dtypes.items()}
+    for chunk in pd.read_csv(path, dtype=read, chunksize=chunksize):
+        for col in flags:
+            chunk[col] = chunk[col].map(CSV_BOOLS, na_action='ignore').astype(object)
+        yield chunk
+
+
+def _write_parts(sources, folder, chunksize):
+    # one Parquet part per cleaned chunk -> (part paths, catalog columns in
+    # the order pd.concat would give them, columns with a value anywhere)
+    names = field_names()
+    parts, columns, typed, ordinal = [], {}, set(), 0
+    for src, path in enumerate(sources):
+        source = os.path.splitext(os.path.basename(path))[0]
+        for chunk in read_chunks(path, chunksize):
+            if chunk.empty:
+                continue
+            df = clean_source(chunk, names, source)
+            columns.update(dict.fromkeys(df.columns))
+            keys = name_keys(df[NAME_COL], start=ordinal).to_numpy()
+            # a column with no value in this chunk is left out of its part,
+            # so its placeholder dtype cannot widen the merged column's type
+            df = df.loc[:, df.notna().any()]
+            typed.update(df.columns)
+            df[KEY_COL] = keys
+            df[SRC_COL] = np.int8(src)
+            df[ORD_COL] = np.arange(ordinal, ordinal + len(df), dtype=np.int64)
+            ordinal += len(df)
+            part = os.path.join(folder, f"part-{len(parts):05d}.parquet")
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), part)
+            parts.append(part)
+    return parts, list(columns), typed
+
+
+def _merge_sql(parts, columns, typed):
+    # catalog.dedupe over the parts; SOURCE_COL holds the bit set of sources
+    files = ', '.join(_lit(p) for p in parts)
+    aggs = []
+    for col in columns:
+        if col == SOURCE_COL:
+            aggs.append(f"bit_or(1 << {SRC_COL}) AS {_q(col)}")
+        elif col not in typed:
+            # never given a value: all-missing float, as in pandas
+            aggs.append(f"CAST(NULL AS DOUBLE) AS {_q(col)}")
+        else:
+            aggs.append(f"arg_min({_q(col)}, {ORD_COL}) FILTER (WHERE {_q(col)} IS NOT NULL) AS {_q(col)}")
+    return f"""
+        SELECT {', '.join(aggs)}
+        FROM read_parquet([{files}], union_by_name=true)
+        GROUP BY {KEY_COL} ORDER BY min({ORD_COL})
+    """
+
+
+def _output_schema(merged):
+    # the merged columns plus what estimate_missing fills in or adds
+    fields = [pa.field(ROW_COL, pa.int64())]
+    for field in merged:
+        if field.name == SOURCE_COL or str(field.type) in ('large_string', 'string_view'):
+            field = pa.field(field.name, pa.string())
+        fields.append(field)
+    schema = pa.schema(fields)
+    for name, typ in [(ENERGY_COL, pa.float64()), (CARBON_LB_COL, pa.float64()),
+                      (ENERGY_SOURCE_COL, pa.string()), (CARBON_SOURCE_COL, pa.string())]:
+        i = schema.get_field_index(name)
+        schema = schema.set(i, pa.field(name, typ)) if i >= 0 else schema.append(pa.field(name, typ))
+    return schema
+
+
+def build_catalog_parquet(sources, out, chunksize=CHUNK_ROWS):
+    # the catalog load_catalog(sources) serves, as a Parquet file with each
+    # row's position in ROW_COL
+    labels = [os.path.splitext(os.path.basename(p))[0] for p in sources]
+    work = f"{out}.{os.getpid()}.parts"
+    os.makedirs(work, exist_ok=True)
+    tmp = f"{out}.{os.getpid()}.tmp"
+    con = duckdb.connect()
+    try:
+        con.execute(f"SET temp_directory = {_lit(work)}")
+        parts, columns, typed = _write_parts(sources, work, chunksize)
+        merged = con.execute(_merge_sql(parts, columns, typed)).fetch_record_batch(chunksize)
+        schema = _output_schema(merged.schema)
+        offset = 0
+        with pq.ParquetWriter(tmp, schema) as writer:
+            for batch in merged:
+                df = batch.to_pandas()
+                masks = df[SOURCE_COL].astype(np.int64)
+                spelled = {m: ','.join(s for i, s in enumerate(labels) if m >> i & 1) for m in masks.unique()}
+                df[SOURCE_COL] = masks.map(spelled)
+                df = estimate_missing(df)
+                df.insert(0, ROW_COL, np.arange(offset, offset + len(df), dtype=np.int64))
+                offset += len(df)
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+        os.replace(tmp, out)
+    finally:
+        con.close()
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def catalog_parquet(sources=CATALOG_SOURCES):
+    # Parquet copy of this version of the catalog; built on first use
+    folder = cache_dir_for(sources[0])
+    os.makedirs(folder, exist_ok=True)
+    prefix = f"catalog.lazy.v{PARQUET_VERSION}."
+    key = f"{catalog_version(sources)}-{CATALOG_VERSION}"
+    out = os.path.join(folder, f"{prefix}{hashlib.sha1(key.encode()).hexdigest()[:16]}.parquet")
+    if not os.path.exists(out):
+        build_catalog_parquet(sources, out)
+        for name in os.listdir(folder):
+            if name.startswith(prefix) and name.endswith('.parquet') and name != os.path.basename(out):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+    return out
+
+
+# --- emissions totals ----------------------------------------------------------
+
+def projects_sql(path, columns):
+    # one row per project_name, like summarize_projects(runs=stream_runs(path)):
+    # readings are float32 there, run totals the max, project totals the sum
+    source = {dst: src for src, dst in EMISSIONS_SOURCE_COLS.items()}
+    cols = [(source.get(dst, dst), dst) for dst in CUMULATIVE_COLS if source.get(dst, dst) in columns]
+    run_aggs = ', '.join(f'max(TRY_CAST({_q(s)} AS FLOAT))::DOUBLE AS {_q(d)}' for s, d in cols)
+    # SUM over no non-NULL value is NULL, i.e. pandas' sum(min_count=1)
+    project_aggs = ', '.join(f'sum({_q(d)}) AS {_q(d)}' for _, d in cols)
+    return f"""
+        WITH runs AS (
+            SELECT project_name, run_id, {run_aggs}
+            FROM {_scan(path)} GROUP BY project_name, run_id
+        )
+        SELECT project_name, {project_aggs}, count(*) AS n_runs
+        FROM runs WHERE project_name IS NOT NULL
+        GROUP BY project_name ORDER BY project_name
+    """
+
+
+class DuckDBDataset:
+    # same query surface as core.Dataset, backed by lazy scans
+
+    def __init__(self, sources=CATALOG_SOURCES, emissions_csv=ingest.EMISSIONS_CSV,
+                 version=None, cache_dir=None):
+        if duckdb is None:
+            raise ImportError("BASS_BACKEND=duckdb needs the duckdb and pyarrow packages")
+        self.version = version or ingest.dataset_version(*sources, emissions_csv)
+        self.con = duckdb.connect()
+        self._lock = threading.Lock()
+        parquet = catalog_parquet(tuple(sources))
+        self.con.execute(f"CREATE VIEW models AS SELECT * FROM {_scan(parquet)}")
+        names = [r[0] for r in self.con.execute("DESCRIBE models").fetchall()]
+        # long free text stays out of results, as with catalog.load_catalog
+        self.hidden = [ROW_COL] + lazy_columns(names)
+        em_names = [r[0] for r in self.con.execute(f"DESCRIBE SELECT * FROM {_scan(emissions_csv)}").fetchall()]
+        self.con.execute(f"CREATE TABLE projects AS {projects_sql(emissions_csv, em_names)}")
+        self._create_merged(cache_dir or cache_dir_for(emissions_csv))
+
+    def _create_merged(self, cache_dir):
+        # core.merge_emissions: exact join on the project name, fuzzy match
+        # (cutoff 0.8) for systems left without a CO2 figure, then the model's
+        # own reported / estimated carbon (estimates.fill_co2)
+        unmatched = self.con.execute(f"""
+            SELECT DISTINCT m.system FROM models m
+            LEFT JOIN projects e ON m.system = e.project_name
+            WHERE m.system IS NOT NULL AND e.{_q(EMISSIONS_COL)} IS NULL
+        """).df()['system']
+        projects = self.con.execute("SELECT project_name FROM projects").df()['project_name']
+        fuzzy = pd.DataFrame({
+            'system': unmatched.astype(str).to_numpy(dtype=object),
+            'matched_project': match_names(unmatched, projects, cutoff=0.8, cache_dir=cache_dir).to_numpy(dtype=object),
+        })
+        self.con.register('fuzzy_df', fuzzy)
+        self.con.execute("CREATE TABLE fuzzy AS SELECT system::VARCHAR AS system, matched_project::VARCHAR AS matched_project FROM fuzzy_df")
+        self.con.unregister('fuzzy_df')
+        measured = f"COALESCE(e.{_q(EMISSIONS_COL)}, f.{_q(EMISSIONS_COL)})"
+        self.con.execute(f"""
+            CREATE VIEW merged AS
+            SELECT m.*,
+                   COALESCE({measured}, m.{_q(CARBON_LB_COL)} / {LB_PER_KG}) AS {_q(CO2_COL)},
+                   CASE WHEN {measured} IS NOT NULL THEN 'emissions_log'
+                        ELSE m.{_q(CARBON_SOURCE_COL)} END AS co2_source
+            FROM models m
+            LEFT JOIN projects e ON m.system = e.project_name
+            LEFT JOIN fuzzy z ON m.system = z.system
+            LEFT JOIN projects f ON z.matched_project = f.project_name
+        """)
+
+    def _query(self, sql, params=()):
+        # one cursor per call: a DuckDB connection is not shared across threads
+        with self._lock:
+            cur = self.con.cursor()
+        try:
+            return cur.execute(sql, list(params)).df()
+        finally:
+            cur.close()
+
+    def _rows(self, df):
+        # result frame indexed by source row position, like df.iloc on the
+        # pandas Dataset, without the hidden columns
+        df = df.set_index(ROW_COL)
+        df.index.name = None
+        return df.drop(columns=[c for c in self.hidden if c in df.columns])
+
+    def tasks(self):
+        found = self._query("SELECT DISTINCT task FROM models WHERE task IS NOT NULL")['task']
+        return sorted(str(t) for t in found)
+
+    def n_models(self):
+        return int(self._query("SELECT count(*) AS n FROM models")['n'].iloc[0])
+
+    def suggest(self, task, max_power=None, max_params=None, max_co2=None, topk=5, pareto=False):
+        # same contract as core.Dataset.suggest
+        where = ["contains(lower(task), ?)"]
+        params = [task.lower()]
+        limits = [(POWER_COL, max_power), (PARAMS_COL, None if max_params is None else max_params * 1e9)]
+        for col, limit in limits:
+            # a missing limit still drops rows without a value, as the sliders do
+            if limit is None:
+                where.append(f"{_q(col)} IS NOT NULL")
+            else:
+                where.append(f"{_q(col)} <= ?")
+                params.append(float(limit))
+        if max_co2 is not None:
+            where.append(f"{_q(CO2_COL)} <= ?")
+            params.append(float(max_co2))
+        order = f"{_q(POWER_COL)} ASC NULLS LAST, {_q(PARAMS_COL)} ASC NULLS LAST, {ROW_COL}"
+        if not pareto:
+            sql = f"SELECT * FROM merged WHERE {' AND '.join(where)} ORDER BY {order} LIMIT {int(topk)}"
+            return self._rows(self._query(sql, params))
+        # the task's rows are scanned once; the skyline is taken over all of
+        # them (the limits are upper bounds on minimized objectives, see
+        # skyline.py) and then filtered by the limits
+        rows = self._query(f"SELECT * FROM merged WHERE {where[0]} ORDER BY {ROW_COL}", params[:1])
+        front = rows.iloc[skyline(objective_ranks(rows, MODEL_OBJECTIVES), np.arange(len(rows)))]
+        keep = front[POWER_COL].notna() & front[PARAMS_COL].notna()
+        if max_power is not None:
+            keep &= front[POWER_COL] <= max_power
+        if max_params is not None:
+            keep &= front[PARAMS_COL] <= max_params * 1e9
+        if max_co2 is not None:
+            keep &= front[CO2_COL] <= max_co2
+        front = front[keep].sort_values([POWER_COL, PARAMS_COL, ROW_COL], na_position='last', kind='stable')
+        return self._rows(front.head(topk))
+
+    def project_emissions(self, projects=None):
+        if projects:
+            marks = ', '.join('?' for _ in projects)
+            return self._query(f"SELECT * FROM projects WHERE project_name IN ({marks})", projects)
+        return self._query("SELECT * FROM projects")
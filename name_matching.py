@@ -0,0 +1,151 @@
+# Fuzzy name matching for the model <-> emissions join.
+#
+# Drop-in replacement for difflib.get_close_matches(name, names, n=1,
+# cutoff=...) that returns the same best match, without running a
+# SequenceMatcher against every candidate:
+#   1. candidates are de-duplicated and bucketed by length; a length window
+#      derived from the cutoff (difflib's real_quick_ratio bound) blocks out
+#      names that can never score high enough,
+#   2. inside the block, difflib's quick_ratio bound (shared character
+#      multiset) is computed for all candidates at once from a character
+#      count matrix,
+#   3. only the survivors, best bound first, get an exact ratio(), and the
+#      scan stops once no remaining bound can beat the best score.
+# The match table (best match and score per name) is persisted with the
+# candidate set it was computed against. Restarts reuse it as is; when new
+# candidates appear, each stored name is only compared against the new ones
+# and keeps whichever best match is higher.
+import difflib
+import os
+
+import numpy as np
+import pandas as pd
+
+from snapshot import feather, pa, read_snapshot, write_snapshot
+
+
+class NameMatcher:
+
+    def __init__(self, candidates):
+        names = sorted({str(c) for c in candidates})
+        self.lengths = np.array([len(n) for n in names], dtype=np.int64)
+        order = np.argsort(self.lengths, kind='stable')
+        self.names = [names[i] for i in order]
+        self.lengths = self.lengths[order]
+        alphabet = sorted({ch for n in self.names for ch in n})
+        self.char_col = {ch: i for i, ch in enumerate(alphabet)}
+        self.counts = np.zeros((len(self.names), len(alphabet)), dtype=np.int32)
+        for row, n in enumerate(self.names):
+            for ch in n:
+                self.counts[row, self.char_col[ch]] += 1
+
+    def best_match(self, word, cutoff=0.8):
+        return self.best_match_scored(word, cutoff)[0]
+
+    def best_match_scored(self, word, cutoff=0.8):
+        # -> (best name or None, its ratio or -1.0)
+        if not self.names:
+            return None, -1.0
+        lw = len(word)
+        # real_quick_ratio: 2*min(la, lb) / (la + lb) >= cutoff
+        lo = np.searchsorted(self.lengths, np.ceil(lw * cutoff / (2 - cutoff) - 1e-9))
+        hi = np.searchsorted(self.lengths, np.floor(lw * (2 - cutoff) / cutoff + 1e-9), side='right')
+        if lo >= hi:
+            return None, -1.0
+        # quick_ratio: 2 * |chars(a) & chars(b)| / (la + lb), all rows at once
+        chars, qcounts = np.unique(list(word), return_counts=True) if lw else ([], [])
+        cols = [self.char_col.get(ch, -1) for ch in chars]
+        known = np.array([c >= 0 for c in cols], dtype=bool)
+        inter = np.zeros(hi - lo, dtype=np.int64)
+        if known.any():
+            block = self.counts[lo:hi][:, np.array(cols)[known]]
+            inter = np.minimum(block, np.asarray(qcounts)[known]).sum(axis=1)
+        total = self.lengths[lo:hi] + lw
+        bound = np.divide(2.0 * inter, total, out=np.ones(hi - lo), where=total > 0)
+        keep = np.flatnonzero(bound >= cutoff)
+        if not len(keep):
+            return None, -1.0
+        keep = keep[np.argsort(-bound[keep], kind='stable')]
+        best, best_score = None, -1.0
+        s = difflib.SequenceMatcher()
+        s.set_seq2(word)
+        for i in keep:
+            if bound[i] < best_score:
+                break
+            name = self.names[lo + i]
+            s.set_seq1(name)
+            score = s.ratio()
+            # difflib keeps the max of (score, name): ties go to the larger name
+            if score >= cutoff and (score, name) > (best_score, best or ''):
+                best, best_score = name, score
+        return best, best_score
+
+    def match_many(self, words, cutoff=0.8):
+        return {w: m for w, (m, _) in self.match_many_scored(words, cutoff).items()}
+
+    def match_many_scored(self, words, cutoff=0.8):
+        out = {}
+        for w in pd.unique(pd.Series(words, dtype=object).dropna()):
+            if isinstance(w, str) and w.strip():
+                out[w] = self.best_match_scored(w, cutoff)
+        return out
+
+
+def _table_paths(cache_dir, cutoff):
+    tag = f"{cutoff:g}".replace('.', '_')
+    return (os.path.join(cache_dir, f"matches.c{tag}.arrow"),
+            os.path.join(cache_dir, f"matches.c{tag}.candidates.arrow"))
+
+
+def _read_table(path, cand_path):
+    if not (os.path.exists(path) and os.path.exists(cand_path)):
+        return {}, set()
+    try:
+        cached = read_snapshot(path)
+        known = set(read_snapshot(cand_path)['candidate'])
+    except (OSError, pa.ArrowInvalid):
+        return {}, set()
+    match = cached['match'].astype(object).where(cached['match'].notna(), None)
+    return dict(zip(cached['name'], zip(match, cached['score']))), known
+
+
+def match_names(words, candidates, cutoff=0.8, cache_dir=None):
+    # words -> Series of best matches (None when nothing clears the cutoff),
+    # aligned to the input; the match table is persisted under cache_dir
+    words = pd.Series(words, dtype=object)
+    current = {str(c) for c in candidates}
+    table, known = {}, set()
+    paths = None
+    if cache_dir is not None and feather is not None:
+        paths = _table_paths(cache_dir, cutoff)
+        table, known = _read_table(*paths)
+        if not known <= current:
+            # candidates were removed: stored best matches may be gone
+            table = {}
+    dirty = False
+    added = current - known if table else set()
+    if added:
+        # the best over old | new candidates is the better of the stored
+        # best and the best among the new ones only
+        new_best = NameMatcher(added).match_many_scored(list(table), cutoff)
+        for name, (m, score) in new_best.items():
+            old_m, old_score = table[name]
+            if m is not None and (score, m) > (old_score, old_m or ''):
+                table[name] = (m, score)
+        dirty = True
+    todo = [w for w in pd.unique(words.dropna())
+            if isinstance(w, str) and w.strip() and w not in table]
+    if todo:
+        table.update(NameMatcher(current).match_many_scored(todo, cutoff))
+        dirty = True
+    if paths is not None and (dirty or known != current):
+        try:
+            write_snapshot(pd.DataFrame({
+                'name': list(table),
+                'match': [m for m, _ in table.values()],
+                'score': [float(sc) for _, sc in table.values()],
+            }), paths[0])
+            write_snapshot(pd.DataFrame({'candidate': sorted(current)}), paths[1])
+        except OSError:
+            pass
+    return words.map({w: m for w, (m, _) in table.items()})
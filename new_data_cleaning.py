@@ -1,114 +1,120 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-
-# Load dataset
-df = pd.read_csv('large_scale_ai_models_added_cols.csv')
-
-# Clean column names
-df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-
-# Convert relevant numeric columns to numeric type
-df['training_power_(watts)'] = pd.to_numeric(df['training_power_(watts)'], errors='coerce')
-df['training_compute_(flop)'] = pd.to_numeric(df['training_compute_(flop)'], errors='coerce')
-
-# Filter top 30 by power
-df_top30 = df.dropna(subset=['training_power_(watts)', 'training_compute_(flop)']) \
-             .nlargest(30, 'training_power_(watts)')
-
-# -------------------------
-# Plot 1: Power vs System
-# -------------------------
-plt.figure(figsize=(14, 6))
-plt.bar(df_top30.sort_values('training_power_(watts)', ascending=False)['system'],
-        df_top30.sort_values('training_power_(watts)', ascending=False)['training_power_(watts)'])
-plt.xticks(rotation=75, ha='right')
-plt.ylabel('Training Power (Watts)')
-plt.title('Training Power vs System (Top 30)')
-plt.tight_layout()
-plt.show()
-
-# -------------------------
-# Plot 2: Power vs Task
-# -------------------------
-plt.figure(figsize=(14, 6))
-plt.bar(df_top30.sort_values('training_power_(watts)', ascending=False)['task'],
-        df_top30.sort_values('training_power_(watts)', ascending=False)['training_power_(watts)'])
-plt.xticks(rotation=75, ha='right')
-plt.ylabel('Training Power (Watts)')
-plt.title('Training Power vs Task (Top 30)')
-plt.tight_layout()
-plt.show()
-
-# system and task are the same for each model, so we can use either one
-plt.figure(figsize=(14, 6))
-
-# Sort and prepare data
-df_sorted = df_top30.sort_values('training_power_(watts)', ascending=False)
-labels = df_sorted['task'] + ' - ' + df_sorted['system']
-
-# Plot
-plt.bar(labels, df_sorted['training_power_(watts)'])
-plt.xticks(rotation=75, ha='right')
-plt.ylabel('Training Power (Watts)')
-plt.title('Training Power vs Task-System (Top 30)')
-plt.tight_layout()
-plt.show()
-
-# -------------------------
-# Plot 3: FLOP vs System
-# -------------------------
-plt.figure(figsize=(14, 6))
-plt.bar(df_top30.sort_values('training_compute_(flop)', ascending=False)['system'],
-        df_top30.sort_values('training_compute_(flop)', ascending=False)['training_compute_(flop)'])
-plt.xticks(rotation=75, ha='right')
-plt.ylabel('Training Compute (FLOP)')
-plt.title('Training Compute (FLOP) vs System (Top 30 by Power)')
-plt.tight_layout()
-plt.show()
-
-'''
-Make a bar plot of power as a function of system with nulls taken out 
-Make a bar plot of power as a function of task with nulls taken out 
-Make a bar plot of FLOP as a function of system with nulls taken out 
-'''
-
-# # -------------------------
-# # Plot 4: Power vs System (All Data)
-# # -------------------------
-# plt.figure(figsize=(12, 6))
-# plt.barh(df.sort_values('training_power_(watts)', ascending=False)['system'],
-#          df.sort_values('training_power_(watts)', ascending=False)['training_power_(watts)'])
-# plt.xlabel('Training Power (Watts)')
-# plt.title('Training Power vs System (All Data)')
-# plt.gca().invert_yaxis()
-
-
-# plt.tight_layout()
-
-# plt.show()
-
-
-# # -------------------------
-# # Plot 5: Power vs Task (All Data)
-# # -------------------------
-# plt.figure(figsize=(12, 6))             
-# plt.barh(df.sort_values('training_power_(watts)', ascending=False)['task'],
-#          df.sort_values('training_power_(watts)', ascending=False)['training_power_(watts)'])
-# plt.xlabel('Training Power (Watts)')
-# plt.title('Training Power vs Task (All Data)')
-# plt.gca().invert_yaxis()
-# plt.tight_layout()
-# plt.show()
-# # -------------------------
-# # Plot 6: FLOP vs System (All Data)
-# # -------------------------
-
-# plt.figure(figsize=(14, 6))             
-# plt.bar(df.sort_values('training_compute_(flop)', ascending=False)['system'],
-#         df.sort_values('training_compute_(flop)', ascending=False)['training_compute_(flop)'])              
-# plt.xticks(rotation=75, ha='right')
-# plt.ylabel('Training Compute (FLOP)')
-# plt.title('Training Compute (FLOP) vs System (All Data)')
-# plt.tight_layout()
-# plt.show()
-
+# Headless report of the top models by training power.
+#
+#   python new_data_cleaning.py -o report/
+#   python new_data_cleaning.py -o report/ --task Chat --task "Language modelling" --top 30
+#
+# Loads the shared cleaned snapshot (ingest.py), computes each ranking once
+# per subset, renders every figure with the Agg backend in a process pool and
+# writes PNG/SVG files plus an index.html per subset to the output directory.
+import argparse
+import html
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import ingest
+
+POWER = 'training_power_(watts)'
+FLOP = 'training_compute_(flop)'
+
+
+def render_bar(spec):
+    # runs in a worker process; Agg needs no display
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(14, 6))
+    plt.bar(spec['labels'], spec['values'])
+    plt.xticks(rotation=75, ha='right')
+    plt.ylabel(spec['ylabel'])
+    plt.title(spec['title'])
+    plt.tight_layout()
+    paths = []
+    for fmt in spec['formats']:
+        path = os.path.join(spec['outdir'], f"{spec['name']}.{fmt}")
+        fig.savefig(path, format=fmt)
+        paths.append(path)
+    plt.close(fig)
+    return paths
+
+
+def figure_specs(df, top, outdir, formats):
+    # Filter top N by power; each ranking is computed once and shared
+    df_top = df.dropna(subset=[POWER, FLOP]).nlargest(top, POWER)
+    by_power = df_top.sort_values(POWER, ascending=False)
+    by_flop = df_top.sort_values(FLOP, ascending=False)
+    system = by_power['system'].astype(str).tolist()
+    task = by_power['task'].astype(str).tolist()
+    power = by_power[POWER].tolist()
+    # system and task are the same for each model, so we can use either one
+    common = {'outdir': outdir, 'formats': formats}
+    return [
+        # Plot 1: Power vs System
+        dict(common, name='power_vs_system', labels=system, values=power,
+             ylabel='Training Power (Watts)', title=f'Training Power vs System (Top {top})'),
+        # Plot 2: Power vs Task
+        dict(common, name='power_vs_task', labels=task, values=power,
+             ylabel='Training Power (Watts)', title=f'Training Power vs Task (Top {top})'),
+        dict(common, name='power_vs_task_system',
+             labels=[f"{t} - {s}" for t, s in zip(task, system)], values=power,
+             ylabel='Training Power (Watts)', title=f'Training Power vs Task-System (Top {top})'),
+        # Plot 3: FLOP vs System
+        dict(common, name='flop_vs_system', labels=by_flop['system'].astype(str).tolist(),
+             values=by_flop[FLOP].tolist(), ylabel='Training Compute (FLOP)',
+             title=f'Training Compute (FLOP) vs System (Top {top} by Power)'),
+    ]
+
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-') or 'all'
+
+
+def subsets(df, tasks):
+    if not tasks:
+        yield 'all', df
+        return
+    for task in tasks:
+        yield slug(task), df[df['task'].astype(str).str.contains(task, case=False, regex=False)]
+
+
+def write_index(outdir, title, specs, fmt):
+    items = '\n'.join(
+        f'<h2>{html.escape(s["title"])}</h2>\n<img src="{s["name"]}.{fmt}" alt="{html.escape(s["title"])}">'
+        for s in specs
+    )
+    with open(os.path.join(outdir, 'index.html'), 'w') as fh:
+        fh.write(f'<!doctype html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title></head>\n'
+                 f'<body>\n<h1>{html.escape(title)}</h1>\n{items}\n</body></html>\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the training power/compute report.')
+    parser.add_argument('-i', '--input', default=ingest.MODELS_CSV, help='models CSV')
+    parser.add_argument('-o', '--output', default='report', help='output directory')
+    parser.add_argument('--task', action='append', help='restrict to models whose task contains this (repeatable; one subset each)')
+    parser.add_argument('--top', type=int, default=30)
+    parser.add_argument('--formats', default='png,svg')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    if not formats:
+        parser.error('no output formats')
+    df = ingest.load_models(args.input)
+    jobs, pages = [], []
+    for name, sub in subsets(df, args.task):
+        outdir = os.path.join(args.output, name)
+        os.makedirs(outdir, exist_ok=True)
+        specs = figure_specs(sub, args.top, outdir, formats)
+        jobs.extend(specs)
+        pages.append((outdir, name, specs))
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        written = [p for paths in pool.map(render_bar, jobs) for p in paths]
+    for outdir, name, specs in pages:
+        write_index(outdir, f'Training power report: {name}', specs, 'svg' if 'svg' in formats else formats[0])
+    print(f"wrote {len(written)} figures for {len(pages)} subset(s) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
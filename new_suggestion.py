@@ -1,82 +1,102 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
-import difflib
+
+import background
+import catalog
+import core
+import ingest
+import profiling
+import result_view
+from rollups import RollupStore
+from schema import load_dictionary
+from shared_dataset import shared_frame
+from suggest import SuggestEngine
 
 # Page config
 st.set_page_config(page_title="AI Model Explorer", layout="wide")
 
+# Opt-in per-rerun timing (profiling.py): BASS_PROFILE=1|otlp or the toggle
+tracer = profiling.start('new_suggestion', profiling.env_format() or (
+    'jsonl' if st.sidebar.toggle("Profile reruns", help="Time each stage of this page and log the spans") else None
+))
+
 # --- Data Loading & Caching ---
-@st.cache_data
-def load_models():
-    df = pd.read_csv('large_scale_ai_models_added_cols.csv')
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    # Numeric conversions
-    num_cols = [
-        'training_power_(watts)', 'training_energy_(kwh)', 'parameters',
-        'training_compute_(flop)', 'training_dataset_size_(datapoints)',
-        'training_time_(hours)', 'hardware_quantity', 'finetune_compute_(flop)'
-    ]
-    for c in num_cols:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors='coerce')
-    # Date parsing
-    if 'publication_date' in df.columns:
-        df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
-    return df
-
-@st.cache_data
-def load_emissions():
-    em = pd.read_csv('bloom_emissions.csv')
-    em.columns = em.columns.str.strip().str.lower().str.replace(' ', '_')
-    # Rename emissions column if needed
-    if 'emissions' in em.columns:
-        em = em.rename(columns={'emissions': 'carbon_emissions_(kg_co2)'})
-    if 'carbon_emissions_(kg_co2)' in em.columns:
-        em['carbon_emissions_(kg_co2)'] = pd.to_numeric(em['carbon_emissions_(kg_co2)'], errors='coerce')
-    return em
-
-def merge_emissions(models_df, em_df):
-    # Merge on project_name to system
-    if 'project_name' in em_df.columns and 'carbon_emissions_(kg_co2)' in em_df.columns:
-        df = models_df.merge(
-            em_df[['project_name', 'carbon_emissions_(kg_co2)']],
-            left_on='system', right_on='project_name', how='left'
-        )
-        # Fuzzy fallback for unmatched entries
-        mask = df['carbon_emissions_(kg_co2)'].isna()
-        if mask.any():
-            names = em_df['project_name'].dropna().astype(str).tolist()
-            def match(name):
-                if not isinstance(name, str) or not name.strip():
-                    return None
-                m = difflib.get_close_matches(name, names, n=1, cutoff=0.8)
-                return m[0] if m else None
-            df.loc[mask, 'matched_project'] = df.loc[mask, 'system'].apply(match)
-            df = df.merge(
-                em_df[['project_name', 'carbon_emissions_(kg_co2)']],
-                left_on='matched_project', right_on='project_name',
-                how='left', suffixes=('', '_fuzzy')
-            )
-            # Combine exact and fuzzy
-            df['carbon_emissions_(kg_co2)'] = df['carbon_emissions_(kg_co2)'].fillna(
-                df.get('carbon_emissions_(kg_co2)_fuzzy')
-            )
-        # Clean up
-        to_drop = [col for col in ['project_name', 'matched_project', 'carbon_emissions_(kg_co2)_fuzzy'] if col in df.columns]
-        df = df.drop(columns=to_drop)
-        return df
-    return models_df
+# Each table is published once per host into shared memory and every session
+# and worker attaches to the same read-only buffers (shared_dataset.py);
+# st.cache_resource hands sessions that object instead of a pickled copy.
+# The version argument keys both: it changes when the source CSV changes.
+# max_entries=2 keeps the previous version only while sessions still on it
+# rerun; each one picks up the new frames on its next interaction.
+@st.cache_resource(max_entries=2)
+def load_models(version):
+    profiling.cache_miss()
+    # the model catalog of every source table (catalog.py), parsed + merged
+    # once per version of the sources, then memory-mapped from the snapshot
+    return shared_frame('catalog', version, catalog.load_catalog)
+
+@st.cache_resource(max_entries=2)
+def load_rollups(version):
+    profiling.cache_miss()
+    # per-run time buckets at several resolutions (rollups.py); the raw
+    # per-interval log is never loaded by the app
+    return RollupStore(ingest.EMISSIONS_CSV)
+
+@st.cache_resource(max_entries=2)
+def load_merged(version):
+    profiling.cache_miss()
+    # models + per-project CO2 totals (core.merge_emissions)
+    def build():
+        with profiling.cached('load.models'):
+            models = load_models(catalog.catalog_version())
+        return core.load_merged(models)
+    return shared_frame('merged', version, build)
+
+@st.cache_resource(max_entries=2)
+def suggest_engine(version):
+    profiling.cache_miss()
+    # task index + pre-ranked order + nearest-neighbour index, built once per
+    # dataset version; results are memoized per query across sessions
+    text = catalog.load_catalog_text()['abstract']
+    return SuggestEngine(load_merged(version), version, text=text)
+
+@st.cache_resource(max_entries=2)
+def result_pages(version):
+    # server-side sort and paging over the cached table (result_view.py)
+    return result_view.ResultView(load_merged(version))
+
+@st.cache_resource
+def load_dictionaries():
+    # the data dictionaries with their column names normalized into 'field'
+    # (schema.load_dictionary), read once per process
+    return {name: result_view.ResultView(load_dictionary(path)) for name, path in
+            [("AI Models", 'ai_models_data_dictionary.csv'), ("Bloom Emissions", 'bloom_data_dictionary.csv')]}
 
 # Load and merge data
-df_models = load_models()
-df_em = load_emissions()
-df_models = merge_emissions(df_models, df_em)
+em_version = ingest.dataset_version(ingest.EMISSIONS_CSV)
+version = ingest.dataset_version(*catalog.CATALOG_SOURCES, ingest.EMISSIONS_CSV)
+with profiling.cached('load.rollups'):
+    rollup = load_rollups(em_version)
+with profiling.cached('load.merged') as sp:
+    df_models = load_merged(version)
+    sp.frame(df_models)
+with profiling.cached('build.engine'):
+    engine = suggest_engine(version)
+if st.session_state.get('data_version') not in (None, version):
+    changes = catalog.last_changes()
+    st.toast("Data updated" + (f": {changes}" if changes else ""))
+st.session_state['data_version'] = version
 
 # Load data dictionaries
-df_ai_dict = pd.read_csv('ai_models_data_dictionary.csv')
-df_bloom_dict = pd.read_csv('bloom_data_dictionary.csv')
-df_ai_dict.columns = df_ai_dict.columns.str.strip().str.lower().str.replace(' ', '_')
-df_bloom_dict.columns = df_bloom_dict.columns.str.strip().str.lower().str.replace(' ', '_')
+with profiling.span('load.dictionaries'):
+    glossary = load_dictionaries()
+    df_ai_dict = glossary["AI Models"].df
+    df_bloom_dict = glossary["Bloom Emissions"].df
+
+def field_help(dd, field):
+    # a dictionary description as widget help text, None when not listed
+    found = dd.loc[dd['field'] == field, 'description'].dropna()
+    return str(found.iloc[0]) if len(found) else None
 
 # --- App UI Tabs ---
 tab = st.sidebar.radio("Navigate to", ["🔍 Suggest", "🌱 Emissions Explorer", "ℹ️ Field Glossary"])
@@ -93,54 +113,132 @@ if tab == "🔍 Suggest":
     max_power = min(raw_max_power, JS_MAX_INT)
     if raw_max_power > JS_MAX_INT:
         st.warning(f"Max training power {raw_max_power} exceeds JS limit; clamped to {JS_MAX_INT}.")
-    help_power = df_ai_dict.loc[df_ai_dict['field']=='training_power_(watts)','description'].squeeze() if 'field' in df_ai_dict.columns else None
+    help_power = field_help(df_ai_dict, 'training_power_(watts)')
     power = st.slider("Max Training Power (Watts)", 0, max_power, max_power, help=help_power)
     # Parameters slider
-    help_params = df_ai_dict.loc[df_ai_dict['field']=='parameters','description'].squeeze() if 'field' in df_ai_dict.columns else None
+    help_params = field_help(df_ai_dict, 'parameters')
     params = st.slider("Max Parameters (billions)", 0, 1000, 1000, help=help_params)
     # CO2 slider
     co2 = None
-    if 'carbon_emissions_(kg_co2)' in df_models.columns:
+    if 'carbon_emissions_(kg_co2)' in df_models.columns and df_models['carbon_emissions_(kg_co2)'].notna().any():
         raw_max_co2 = int(df_models['carbon_emissions_(kg_co2)'].max(skipna=True) or 0)
         max_co2 = min(raw_max_co2, JS_MAX_INT)
         if raw_max_co2 > JS_MAX_INT:
             st.warning(f"Max CO₂ {raw_max_co2} exceeds JS limit; clamped to {JS_MAX_INT}.")
-        help_co2 = df_bloom_dict.loc[df_bloom_dict['field']=='carbon_emissions_(kg_co2)','description'].squeeze() if 'field' in df_bloom_dict.columns else None
+        # the log's 'emissions' column is renamed on load (ingest.clean_emissions)
+        help_co2 = field_help(df_bloom_dict, 'emissions')
         co2 = st.slider("Max Carbon Emissions (kg CO₂)", 0, max_co2, max_co2, help=help_co2)
     # Top K
     topk = st.slider("Number of suggestions", 1, 10, 5)
-    # Filter and show
-    sel = df_models[df_models['task'].str.contains(task, case=False, na=False)]
-    sel = sel[(sel['training_power_(watts)']<=power) & (sel['parameters']<=params*1e9)]
-    if co2 is not None:
-        sel = sel[sel['carbon_emissions_(kg_co2)']<=co2]
-    sug = sel.sort_values(['training_power_(watts)','parameters'], na_position='last').head(topk)
-    if not sug.empty:
-        cols = ['system','task','training_power_(watts)','training_energy_(kwh)','parameters','organization']
+    show_all = st.toggle("Show all matches", help="List every model within the limits, paged and sortable")
+    ranking = st.radio(
+        "Ranking", ["Lowest power first", "Pareto trade-offs"], horizontal=True,
+        help="Pareto: only models no other model beats on power, energy, CO₂, parameters, compute and citations at once"
+    )
+    pareto = ranking == "Pareto trade-offs"
+    # Filter and show; the query runs on the shared background pool, where
+    # identical queries from other sessions are computed once (background.py)
+    k = len(df_models) if show_all else topk
+    pos = background.latest('suggest', (version, task, power, params, co2, k, pareto),
+                            lambda: engine.suggest_positions(task, power, params, co2, k, pareto))
+    if len(pos):
+        cols = ['system','task','training_power_(watts)','training_energy_(kwh)','training_energy_source','parameters','organization']
         if co2 is not None:
-            cols.insert(4,'carbon_emissions_(kg_co2)')
-        st.dataframe(sug[cols])
+            cols[5:5] = ['carbon_emissions_(kg_co2)', 'co2_source']
+        if pareto:
+            cols[-1:-1] = ['training_compute_(flop)', 'citations']
+        # only the visible page of the displayed columns is sent
+        result_view.show(result_pages(version), pos, cols, key='suggest', sortable=show_all)
     else:
         st.warning("No models match your criteria.")
+    # nearest neighbours of one model among those cheaper to train (similar.py)
+    st.subheader("Similar but cheaper")
+    systems = df_models['system'].astype(str)
+    options = sorted(systems.unique())
+    like = st.selectbox("Models like:", options,
+                        index=options.index(str(df_models['system'].iloc[pos[0]])) if len(pos) else 0)
+    costs = {
+        'Training energy (kWh)': 'training_energy_(kwh)', 'Carbon emissions (kg CO₂)': 'carbon_emissions_(kg_co2)',
+        'Training compute (FLOP)': 'training_compute_(flop)', 'Training power (W)': 'training_power_(watts)',
+    }
+    costs = {label: col for label, col in costs.items() if col in df_models.columns}
+    cost = costs[st.selectbox("Cheaper in:", list(costs))]
+    pos = int(np.flatnonzero(systems.to_numpy() == like)[0])
+    if pd.isna(df_models[cost].iloc[pos]):
+        st.info(f"{like} has no {cost} figure to compare against.")
+    else:
+        near = background.latest('similar', (version, pos, topk, cost),
+                                 lambda: engine.similar(pos, topk, cheaper_by=cost))
+        if near.empty:
+            st.info(f"No model is cheaper than {like} in {cost}.")
+        else:
+            cols = ['system', 'distance', cost, 'task', 'domain', 'parameters', 'training_compute_(flop)', 'organization']
+            cols = [c for c in dict.fromkeys(cols) if c in near.columns]
+            result_view.show(result_view.ResultView(near[cols]), np.arange(len(near)), cols,
+                             key='similar', sortable=False)
+    cache_stats = engine.cache.stats()
+    bg_stats = background.CALLS.stats()
+    st.sidebar.caption(
+        f"Query cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%}), {cache_stats['size']} entries · "
+        f"background: {bg_stats['in_flight']} running, {bg_stats['shared']} shared, "
+        f"{bg_stats['cancelled']} cancelled"
+    )
 
 elif tab == "🌱 Emissions Explorer":
     st.header("Bloom Emissions Explorer")
-    if 'project_name' in df_em.columns:
-        names = sorted(df_em['project_name'].dropna().unique())
+    names = rollup.projects()
+    if names:
         sel_proj = st.multiselect("Select projects:", names, default=names[:3])
-        df_e = df_em[df_em['project_name'].isin(sel_proj)]
-        if 'carbon_emissions_(kg_co2)' in df_e.columns:
-            st.bar_chart(df_e.set_index('project_name')['carbon_emissions_(kg_co2)'])
+        # run totals straight from the rollup's run table
+        totals = rollup.totals(sel_proj)
+        if 'carbon_emissions_(kg_co2)' in totals.columns and len(totals):
+            with profiling.span('render.bar_chart'):
+                profiling.shipped(totals)
+                st.bar_chart(totals['carbon_emissions_(kg_co2)'])
+        # runs over time at the coarsest resolution that fits the point budget
+        metrics = {
+            'CO₂ (kg)': 'carbon_emissions_(kg_co2)', 'Energy (kWh)': 'energy_consumed',
+            'GPU energy (kWh)': 'gpu_energy', 'CPU energy (kWh)': 'cpu_energy',
+            'RAM energy (kWh)': 'ram_energy', 'GPU power (W)': 'gpu_power',
+            'CPU power (W)': 'cpu_power', 'RAM power (W)': 'ram_power',
+        }
+        metric = metrics[st.selectbox("Metric over time:", list(metrics))]
+        if not metric.endswith('_power') and st.radio("Show", ["Cumulative", "Per interval"], horizontal=True) == "Per interval":
+            metric += '_interval'
+        max_points = st.slider("Max points per run", 20, 1000, 300, step=20)
+
+        def line_chart():
+            # runs on the background pool: no Streamlit calls in here
+            series, width = rollup.series(sel_proj, max_points)
+            if not len(series) or metric not in series.columns:
+                return series, width, None
+            return series, width, series.assign(
+                run=series['project_name'].astype(str) + ' · ' + series['run_id'].astype(str).str[:8],
+                minutes=series['elapsed_s'] / 60,
+            ).pivot_table(index='minutes', columns='run', values=metric, observed=True)
+
+        with profiling.span('rollup.query') as sp:
+            series, width, chart = background.latest(
+                'line_chart', (em_version, tuple(sel_proj), max_points, metric), line_chart)
+            sp.set(level_s=width)
+        if chart is not None:
+            with profiling.span('render.line_chart'):
+                profiling.shipped(chart)
+                st.line_chart(chart, x_label='Elapsed run time (min)')
+            st.caption(f"{len(series)} points at {width} s resolution")
         else:
-            st.info("No carbon emissions data available.")
+            st.info("No emissions data for the selected projects.")
     else:
-        st.info("Emissions data lacks 'project_name' column.")
+        st.info("No emissions runs available.")
 
 else:
     st.header("Data Field Glossary")
     dict_choice = st.selectbox("Choose dictionary:", ["AI Models","Bloom Emissions"])
-    dd = df_ai_dict if dict_choice=="AI Models" else df_bloom_dict
-    if 'field' in dd.columns and 'description' in dd.columns:
-        st.dataframe(dd.rename(columns={'field':'Column','description':'Description'})[['Column','Description']])
+    view = glossary[dict_choice]
+    if 'column' in view.df.columns and 'description' in view.df.columns:
+        result_view.show(view, np.arange(len(view.df)), ['column', 'description'], key='glossary')
     else:
         st.info("Selected dictionary missing expected fields.")
+
+profiling.panel(profiling.finish(tracer))
@@ -0,0 +1,106 @@
+# Server-side reduction of scatter data before it is sent to the browser.
+#
+# Altair embeds the chart data inline in the page, so the payload and render
+# time grow with the number of points (and Altair refuses more than 5000
+# rows by default). reduce_xy() keeps the payload under a point budget:
+#   - 'points': the raw (x, y) pairs, when they already fit the budget
+#   - 'lttb':   Largest-Triangle-Three-Buckets downsampling along x, which
+#               keeps the visual shape and the extremes of a time series
+#   - 'bins':   a 2-D histogram over the visible range; one row per
+#               non-empty cell with its centre and point count
+# Datetime axes are handled as int64 nanoseconds internally.
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 5000
+
+
+def _as_float(s):
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.astype('datetime64[ns]').astype(np.int64).to_numpy(dtype=np.float64)
+    return s.to_numpy(dtype=np.float64)
+
+
+def _like(values, template):
+    # back to the template column's kind (datetime or float)
+    if pd.api.types.is_datetime64_any_dtype(template):
+        return pd.to_datetime(np.asarray(values).astype(np.int64), unit='ns')
+    return values
+
+
+def clip_range(df, col, lo=None, hi=None):
+    # restrict to the visible range of one axis before reducing
+    keep = pd.Series(True, index=df.index)
+    if lo is not None:
+        keep &= df[col] >= lo
+    if hi is not None:
+        keep &= df[col] <= hi
+    return df[keep]
+
+
+def lttb_indices(x, y, budget):
+    # indices of `budget` points chosen by LTTB; x must be sorted
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n) if budget >= n else np.linspace(0, n - 1, max(budget, 1)).astype(np.int64)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    out = np.empty(budget, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    prev = 0
+    for i in range(budget - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # average of the next bucket is the third triangle vertex
+        nlo, nhi = hi, min(max(edges[i + 2] if i + 2 < len(edges) else n, hi + 1), n)
+        ax, ay = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        px, py = x[prev], y[prev]
+        area = np.abs((px - ax) * (y[lo:hi] - py) - (px - x[lo:hi]) * (ay - py))
+        prev = lo + int(np.argmax(area))
+        out[i + 1] = prev
+    return out
+
+
+def bin_2d(x, y, budget):
+    # non-empty cells of a sqrt(budget) x sqrt(budget) grid
+    side = max(1, int(np.sqrt(budget)))
+    out = {}
+    codes = np.zeros(len(x), dtype=np.int64)
+    for axis, values in (('x', x), ('y', y)):
+        lo, hi = values.min(), values.max()
+        width = (hi - lo) / side if hi > lo else 1.0
+        idx = np.clip(((values - lo) / width).astype(np.int64), 0, side - 1)
+        codes = codes * side + idx
+        out[axis] = (lo, width)
+    counts = np.bincount(codes, minlength=side * side)
+    cells = np.flatnonzero(counts)
+    ix, iy = np.divmod(cells, side)
+    (x_lo, x_w), (y_lo, y_w) = out['x'], out['y']
+    return x_lo + (ix + 0.5) * x_w, y_lo + (iy + 0.5) * y_w, counts[cells]
+
+
+def reduce_xy(df, x_col, y_col, budget=2000, mode='auto'):
+    # -> (frame with x_col, y_col[, 'count'], mode actually used)
+    budget = int(min(max(budget, 3), MAX_POINTS))
+    df = df[[x_col, y_col]].dropna()
+    if mode == 'auto':
+        if len(df) <= budget:
+            mode = 'points'
+        elif pd.api.types.is_datetime64_any_dtype(df[x_col]):
+            mode = 'lttb'
+        else:
+            mode = 'bins'
+    if mode == 'points' or len(df) <= 2:
+        if len(df) > budget:
+            # evenly strided sample rather than the first `budget` rows
+            df = df.iloc[np.linspace(0, len(df) - 1, budget).astype(np.int64)]
+        return df, 'points'
+    if mode == 'lttb':
+        df = df.sort_values(x_col, kind='stable')
+        idx = lttb_indices(_as_float(df[x_col]), _as_float(df[y_col]), budget)
+        return df.iloc[idx], 'lttb'
+    cx, cy, counts = bin_2d(_as_float(df[x_col]), _as_float(df[y_col]), budget)
+    reduced = pd.DataFrame({
+        x_col: _like(cx, df[x_col]),
+        y_col: _like(cy, df[y_col]),
+        'count': counts,
+    })
+    return reduced, 'bins'
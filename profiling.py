@@ -0,0 +1,264 @@
+# Opt-in timing spans for app reruns and the core query path.
+#
+# Off by default and close to free when off: span() hands back a shared
+# no-op object unless a Tracer is active in the current thread (Streamlit
+# runs each session's script in its own thread). Enable it with
+#
+#   BASS_PROFILE=1 streamlit run new_suggestion.py      # plain JSON lines
+#   BASS_PROFILE=otlp streamlit run new_suggestion.py   # OTLP/JSON-shaped spans
+#
+# or with the "Profile reruns" toggle in the sidebar. Each rerun becomes one
+# trace: a root span with one child per stage (loading, merge, filter, rank,
+# rendering). Spans record cache hits/misses of the cached loaders, frame
+# sizes and the rows shipped to the browser, and are appended to
+# BASS_PROFILE_FILE (default .bass_cache/spans.jsonl).
+import contextvars
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not on POSIX; traces then carry no peak-RSS figure
+    resource = None
+
+from snapshot import CACHE_DIR
+
+ENV_VAR = 'BASS_PROFILE'
+SPANS_FILE = os.environ.get('BASS_PROFILE_FILE', os.path.join(CACHE_DIR, 'spans.jsonl'))
+
+_current = contextvars.ContextVar('bass_tracer', default=None)
+
+
+def env_format():
+    # 'jsonl', 'otlp' or None (disabled) from BASS_PROFILE
+    value = os.environ.get(ENV_VAR, '').strip().lower()
+    if value in ('', '0', 'false', 'off', 'no'):
+        return None
+    return 'otlp' if value == 'otlp' else 'jsonl'
+
+
+def _frame_attrs(df, prefix):
+    if hasattr(df, 'nbytes') and hasattr(df, 'num_rows'):  # pyarrow.Table
+        return {f'{prefix}.rows': df.num_rows, f'{prefix}.columns': df.num_columns,
+                f'{prefix}.bytes': int(df.nbytes)}
+    return {
+        f'{prefix}.rows': int(len(df)),
+        f'{prefix}.columns': int(df.shape[1]) if df.ndim > 1 else 1,
+        f'{prefix}.bytes': int(df.memory_usage(deep=True).sum() if df.ndim > 1 else df.memory_usage(deep=True)),
+    }
+
+
+class Span:
+
+    def __init__(self, name, span_id, parent_id, attributes):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+        self.duration_ns = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def frame(self, df, prefix='frame'):
+        # size of a DataFrame this stage produced or holds
+        self.attributes.update(_frame_attrs(df, prefix))
+
+    def close(self):
+        self.duration_ns = time.perf_counter_ns() - self._t0
+
+    @property
+    def duration_ms(self):
+        return (self.duration_ns or 0) / 1e6
+
+    def record(self, trace_id, service):
+        return {
+            'trace_id': trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+            'service': service, 'name': self.name, 'start_ns': self.start_ns,
+            'duration_ms': round(self.duration_ms, 3), 'attributes': self.attributes,
+        }
+
+    def otlp(self, trace_id):
+        return {
+            'traceId': trace_id, 'spanId': self.span_id, 'parentSpanId': self.parent_id or '',
+            'name': self.name, 'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.start_ns + (self.duration_ns or 0)),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+        }
+
+
+def _otlp_value(v):
+    if isinstance(v, bool):
+        return {'boolValue': v}
+    if isinstance(v, int):
+        return {'intValue': str(v)}
+    if isinstance(v, float):
+        return {'doubleValue': v}
+    return {'stringValue': str(v)}
+
+
+class _NoopSpan:
+    name = None
+    attributes = {}
+
+    def set(self, **attributes):
+        pass
+
+    def frame(self, df, prefix='frame'):
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class Tracer:
+    # the spans of one rerun (one trace)
+
+    def __init__(self, service, fmt='jsonl', path=None):
+        self.service = service
+        self.fmt = fmt
+        self.path = path or SPANS_FILE
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self._open = []
+
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = self._open[-1].span_id if self._open else None
+        sp = Span(name, os.urandom(8).hex(), parent, attributes)
+        self.spans.append(sp)
+        self._open.append(sp)
+        try:
+            yield sp
+        finally:
+            sp.close()
+            self._open.pop()
+
+    def innermost(self, key=None):
+        # innermost open span, or the innermost carrying attribute key
+        for sp in reversed(self._open):
+            if key is None or key in sp.attributes:
+                return sp
+        return None
+
+    def export(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.fmt == 'otlp':
+            lines = [json.dumps({
+                'resourceSpans': [{
+                    'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service}}]},
+                    'scopeSpans': [{'scope': {'name': 'bass-ml'}, 'spans': [s.otlp(self.trace_id) for s in self.spans]}],
+                }]
+            })]
+        else:
+            lines = [json.dumps(s.record(self.trace_id, self.service)) for s in self.spans]
+        with open(self.path, 'a') as fh:
+            fh.write('\n'.join(lines) + '\n')
+
+    def rows(self):
+        # flat view for the in-app panel
+        depth = {}
+        out = []
+        for sp in self.spans:
+            depth[sp.span_id] = depth.get(sp.parent_id, -1) + 1
+            cache = sp.attributes.get('cache.hit')
+            out.append({
+                'stage': '· ' * depth[sp.span_id] + sp.name,
+                'ms': round(sp.duration_ms, 2),
+                'cache': None if cache is None else ('hit' if cache else 'miss'),
+                'rows': sp.attributes.get('frame.rows', sp.attributes.get('frontend.rows')),
+                'MB': round(sp.attributes.get('frame.bytes', sp.attributes.get('frontend.bytes', 0)) / 1e6, 3) or None,
+            })
+        return out
+
+
+# --- module-level helpers used by the apps and the core ---------------------
+
+def span(name, **attributes):
+    tracer = _current.get()
+    if tracer is None:
+        return _noop_cm
+    return tracer.span(name, **attributes)
+
+
+class _NoopCM:
+    def __enter__(self):
+        return NOOP
+
+    def __exit__(self, *exc):
+        return False
+
+
+_noop_cm = _NoopCM()
+
+
+def cached(name, **attributes):
+    # span around a call to a cached loader; the loader body calls
+    # cache_miss(), so a span that is never marked was served from cache
+    return span(name, **{'cache.hit': True}, **attributes)
+
+
+def cache_miss():
+    tracer = _current.get()
+    if tracer is not None:
+        sp = tracer.innermost('cache.hit')
+        if sp is not None:
+            sp.set(**{'cache.hit': False})
+
+
+def shipped(df):
+    # rows/bytes of a frame (or Arrow table) handed to the frontend in the
+    # current span
+    tracer = _current.get()
+    if tracer is not None and tracer.innermost() is not None:
+        tracer.innermost().set(**_frame_attrs(df, 'frontend'))
+
+
+def start(service, fmt):
+    # begin tracing one script run; fmt None leaves tracing off for this run.
+    # Replaces any tracer a previous, interrupted run left in this thread
+    if fmt is None:
+        _current.set(None)
+        return None
+    tracer = Tracer(service, fmt)
+    root = Span('rerun', os.urandom(8).hex(), None, {'service': service})
+    tracer.spans.append(root)
+    tracer._open.append(root)
+    _current.set(tracer)
+    return tracer
+
+
+def finish(tracer):
+    # close the root span, export the trace and stop tracing this thread
+    if tracer is None:
+        return None
+    root = tracer.spans[0]
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        root.set(**{'process.max_rss_mb': round(rss / (1e6 if sys.platform == 'darwin' else 1e3), 1)})
+    root.close()
+    tracer._open.clear()
+    _current.set(None)
+    try:
+        tracer.export()
+    except OSError:
+        pass  # read-only checkout; the panel still shows the spans
+    return tracer
+
+
+def panel(tracer):
+    # sidebar table of the current rerun's spans (Streamlit apps only)
+    import streamlit as st
+
+    if tracer is None:
+        return
+    with st.sidebar.expander("Profile", expanded=True):
+        st.dataframe(tracer.rows(), hide_index=True)
+        st.caption(f"trace {tracer.trace_id[:8]} · appended to {tracer.path}")
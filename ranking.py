@@ -0,0 +1,35 @@
+# Top-k selection over a frame pre-sorted once by its ranking keys.
+#
+# The suggestion views used to sort the whole filtered frame on every rerun
+# just to keep .head(k) rows, with k <= 20. TopKRanker sorts the full table
+# once at load time and stores each row's rank; a filtered query (given as
+# row positions) is then answered by an argpartition on the ranks of the
+# candidate rows plus a sort of the k winners.
+import numpy as np
+
+
+class TopKRanker:
+
+    def __init__(self, df, by, ascending=True, na_position='last'):
+        # the same sort_values call the views used, applied to the full
+        # table; multi-key sorts are stable, so restricting this order to a
+        # subset gives exactly the subset's own sorted order
+        order = (
+            df.reset_index(drop=True)
+              .sort_values(by, ascending=ascending, na_position=na_position, kind='stable')
+              .index.to_numpy()
+        )
+        self.rank = np.empty(len(order), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+
+    def top_k(self, positions, k):
+        # positions: iloc positions of the rows that passed the filters;
+        # returns the k best of them in ranking order
+        positions = np.asarray(positions, dtype=np.int64)
+        if k <= 0 or not len(positions):
+            return positions[:0]
+        ranks = self.rank[positions]
+        if len(positions) > k:
+            part = np.argpartition(ranks, k - 1)[:k]
+            positions, ranks = positions[part], ranks[part]
+        return positions[np.argsort(ranks)]
@@ -0,0 +1,266 @@
+# Incremental rebuild of the cleaned tables when a source CSV changes.
+#
+# Next to each snapshot we keep the last cleaned frame plus a hash of every
+# raw CSV row. When the CSV changes, the new file is parsed, its rows hashed
+# and diffed against that state by row key (system / model name); only the
+# inserted or changed rows go through the cleaner, the rest are reused from
+# the previous frame. The spliced frame is then compacted again as a whole
+# (schema.apply_schema), which is a single vectorized pass.
+#
+# Rows appended at the end of the file skip the parse and the hashing too:
+# like emissions.stream_runs, a small JSON file next to the state records the
+# byte offset the state covers, a digest of the bytes before it and the dtype
+# of every raw column. When those bytes are unchanged only the bytes after
+# the offset are parsed (with the recorded dtypes, so they hash as a full
+# read would), hashed and cleaned. The file is still read once to check the
+# digest, and anything that is not a clean append (an edited row, a new key
+# that collides, a value that does not fit the recorded dtype) falls back to
+# the full parse and diff.
+#
+# Only building the cleaned frame is incremental. Everything built from it
+# for a dataset version (the catalog merge, the shared-memory frame,
+# SuggestEngine with its token, range, skyline and nearest-neighbour
+# indexes, the ranker) is built from scratch for the new version; a one-row
+# edit costs one row of cleaning plus those full passes.
+import hashlib
+import io
+import json
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from snapshot import cache_dir_for, feather, pa, read_snapshot, write_snapshot
+
+HASH_COL = '__row_hash__'
+APPEND_STATE_VERSION = 1
+BOOL_OBJECT = 'bool-object'
+# read_csv's default spellings of a boolean
+CSV_BOOLS = {'True': True, 'TRUE': True, 'true': True,
+             'False': False, 'FALSE': False, 'false': False}
+
+# abspath -> TableDiff of the most recent incremental rebuild in this process
+LAST_DIFFS = {}
+
+
+class TableDiff(NamedTuple):
+    inserted: pd.Index
+    deleted: pd.Index
+    changed: pd.Index
+
+    def summary(self):
+        return f"+{len(self.inserted)} new, {len(self.changed)} changed, -{len(self.deleted)} removed"
+
+
+def row_hashes(raw):
+    # one uint64 per raw row, independent of the row's position
+    return pd.util.hash_pandas_object(raw, index=False).to_numpy()
+
+
+def diff_rows(old_keys, old_hashes, new_keys, new_hashes):
+    old = pd.Series(np.asarray(old_hashes), index=pd.Index(old_keys))
+    new = pd.Series(np.asarray(new_hashes), index=pd.Index(new_keys))
+    common = new.index.intersection(old.index)
+    same = new.reindex(common).to_numpy() == old.reindex(common).to_numpy()
+    return TableDiff(
+        inserted=new.index.difference(old.index),
+        deleted=old.index.difference(new.index),
+        changed=common[~same],
+    )
+
+
+def state_path(path, kind, version=1):
+    # deliberately not '<stem>.<kind>.*' so snapshot._drop_stale keeps it
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir_for(path), f"{stem}.{kind}-state.v{version}.arrow")
+
+
+def _read_state(state):
+    if feather is None or not os.path.exists(state):
+        return None
+    try:
+        return read_snapshot(state)
+    except (OSError, pa.ArrowInvalid):
+        return None  # corrupt or truncated state; rebuilt in full
+
+
+def _plain(df):
+    # undo the compact categoricals so reused and freshly cleaned rows
+    # concatenate into the same dtypes the cleaner produces
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+
+def _splice(raw, keys, prev, key, clean):
+    diff = diff_rows(prev[key], prev[HASH_COL], keys, row_hashes(raw))
+    dirty = keys.isin(diff.inserted.append(diff.changed))
+    kept = _plain(prev.drop(columns=[HASH_COL]).set_index(key).loc[keys[~dirty]].reset_index())
+    if dirty.any():
+        fresh = clean(raw[dirty].copy())
+        if set(fresh.columns) != set(kept.columns):
+            # the CSV gained or lost a column: the previous rows cannot be
+            # reused as they are, so everything is cleaned again
+            return clean(raw.copy()), diff
+        merged = pd.concat([kept[fresh.columns], fresh], ignore_index=True)
+    else:
+        merged = kept
+    # back to the CSV's row order
+    order = pd.Index(merged[key]).get_indexer(keys)
+    return merged.iloc[order].reset_index(drop=True), diff
+
+
+def _raw_dtypes(raw):
+    # dtype name per raw column, or None when a tail read could type a value
+    # differently from a full read. An object column of parsed booleans
+    # (True/False with gaps) is recorded as BOOL_OBJECT
+    dtypes = []
+    for col in raw.columns:
+        dtype = raw[col].dtype
+        if dtype == object:
+            inferred = pd.api.types.infer_dtype(raw[col], skipna=True)
+            if inferred == 'boolean':
+                dtypes.append(BOOL_OBJECT)
+                continue
+            if inferred not in ('string', 'empty'):
+                return None
+        elif not isinstance(dtype, pd.StringDtype) and dtype.kind not in 'bif':
+            return None
+        dtypes.append(str(dtype))
+    return dtypes
+
+
+def _append_meta(raw, key_col, data):
+    # what the next call needs to parse only the bytes appended after data
+    dtypes = _raw_dtypes(raw)
+    if dtypes is None or not data.endswith(b'\n'):
+        return None
+    return {
+        'version': APPEND_STATE_VERSION,
+        'columns': list(raw.columns),
+        'dtypes': dtypes,
+        'key_col': key_col,
+        'offset': len(data),
+        'digest': hashlib.sha1(data).hexdigest(),
+    }
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == APPEND_STATE_VERSION else None
+
+
+def _appended(data, meta, prev, key):
+    # raw rows appended to data since meta was written, with the digest of
+    # all of data, or None when the file changed in any other way
+    offset = meta['offset']
+    if len(data) < offset or not data.endswith(b'\n'):
+        return None
+    digest = hashlib.sha1(data[:offset])
+    if digest.hexdigest() != meta['digest']:
+        return None
+    digest.update(data[offset:])
+    columns = meta['columns']
+    dtypes = {c: object if d == BOOL_OBJECT else d for c, d in zip(columns, meta['dtypes'])}
+    if not data[offset:].strip():
+        rows = pd.DataFrame({c: pd.Series(dtype=dtypes[c]) for c in columns})
+        return rows, digest
+    try:
+        rows = pd.read_csv(io.BytesIO(data[offset:]), header=None, names=columns, dtype=dtypes)
+    except (ValueError, TypeError):
+        return None
+    for col, dtype in zip(columns, meta['dtypes']):
+        if dtype == BOOL_OBJECT:
+            values = rows[col].dropna()
+            if not values.isin(list(CSV_BOOLS)).all():
+                return None
+            rows[col] = rows[col].map(CSV_BOOLS, na_action='ignore').astype(object)
+    keys = rows[meta['key_col']]
+    # extra fields would have become the index; duplicate or reused keys
+    # need the full diff
+    if (not isinstance(rows.index, pd.RangeIndex) or not keys.is_unique
+            or keys.isin(prev[key]).any()):
+        return None
+    return rows, digest
+
+
+def _extend(prev, rows, key, key_col, clean):
+    # prev (in CSV order) with the cleaned appended rows after it
+    kept = _plain(prev.drop(columns=[HASH_COL]))
+    diff = TableDiff(inserted=pd.Index(rows[key_col], name=key),
+                     deleted=pd.Index([], name=key), changed=pd.Index([], name=key))
+    if rows.empty:
+        return kept, diff
+    fresh = clean(rows.copy())
+    if set(fresh.columns) != set(kept.columns):
+        return None
+    return pd.concat([kept[fresh.columns], fresh], ignore_index=True), diff
+
+
+def _write_state(df, hashes, meta, state, meta_path):
+    if feather is None:
+        return
+    try:
+        # the meta goes first and comes back last, so it never describes
+        # another version of the state
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        write_snapshot(df.assign(**{HASH_COL: hashes}), state)
+        if meta is not None:
+            tmp = f"{meta_path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as fh:
+                json.dump(meta, fh)
+            os.replace(tmp, meta_path)
+    except OSError:
+        pass  # read-only checkout; next change falls back to a full clean
+
+
+def incremental_build(path, kind, key, normalize, clean, compact, version=1):
+    # -> clean+compact frame for the CSV at path. key is the (normalized)
+    # name of a unique row-key column, normalize the cleaner's column
+    # normalizer, version the cleaner version (a new one rebuilds in full)
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    state = state_path(path, kind, version)
+    meta_path = os.path.splitext(state)[0] + '.json'
+    prev = _read_state(state)
+    if prev is not None and key not in prev.columns:
+        prev = None
+    meta = _read_meta(meta_path) if prev is not None else None
+    tail = _appended(data, meta, prev, key) if meta is not None else None
+    extended = _extend(prev, tail[0], key, meta['key_col'], clean) if tail is not None else None
+    if extended is not None:
+        rows, digest = tail
+        df, diff = extended
+        LAST_DIFFS[os.path.abspath(path)] = diff
+        hashes = np.concatenate([prev[HASH_COL].to_numpy(), row_hashes(rows)])
+        meta = dict(meta, offset=len(data), digest=digest.hexdigest())
+        df = compact(df)
+        _write_state(df, hashes, meta, state, meta_path)
+        return df
+
+    raw = pd.read_csv(io.BytesIO(data))
+    key_cols = raw.columns[normalize(raw.columns) == key]
+    keys = pd.Index(raw[key_cols[0]], name=key) if len(key_cols) == 1 else None
+    if prev is not None and keys is not None and keys.is_unique:
+        df, diff = _splice(raw, keys, prev, key, clean)
+        LAST_DIFFS[os.path.abspath(path)] = diff
+    else:
+        df = clean(raw.copy())
+        LAST_DIFFS.pop(os.path.abspath(path), None)
+    df = compact(df)
+    if keys is not None:
+        meta = _append_meta(raw, key_cols[0], data) if keys.is_unique else None
+        _write_state(df, row_hashes(raw), meta, state, meta_path)
+    return df
+
+
+def last_diff(path):
+    # TableDiff of the last incremental rebuild of path, or None
+    return LAST_DIFFS.get(os.path.abspath(path))
@@ -0,0 +1,101 @@
+# Paged result tables for the Streamlit views.
+#
+# st.dataframe serializes the whole frame it is given on every rerun, and
+# st.table renders every cell as static HTML, so the payload grew with the
+# number of matching models and with every column of the frame, long text
+# included. A ResultView keeps a query's rows as positions into the cached
+# frame, sorts and pages them on the server, and hands the browser only the
+# visible page of the displayed columns as an Arrow table (a pandas frame
+# without pyarrow). A rerun ships at most page_size rows, however many models
+# matched.
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; pages are then shipped as pandas
+    pa = None
+
+from indexes import EMPTY
+from ranking import TopKRanker
+
+PAGE_SIZES = (10, 25, 50, 100)
+DEFAULT_PAGE_SIZE = 25
+# sort option that keeps the order the rows were given in (e.g. a ranking)
+GIVEN_ORDER = '(ranking)'
+
+
+class ResultView:
+    # one per cached frame; the per-column sort orders are built on first use
+
+    def __init__(self, df):
+        self.df = df
+        self._rankers = {}
+
+    def ranker(self, by, ascending=True):
+        key = (by, ascending)
+        if key not in self._rankers:
+            self._rankers[key] = TopKRanker(self.df[[by]], [by], ascending=ascending, na_position='last')
+        return self._rankers[key]
+
+    def page_positions(self, positions, by=None, ascending=True, page=0, page_size=DEFAULT_PAGE_SIZE):
+        # positions of the rows on page `page` (0-based) after sorting by
+        # column `by` (missing values last); by=None keeps the given order
+        positions = np.asarray(positions, dtype=np.int64)
+        lo = page * page_size
+        if lo >= len(positions):
+            return EMPTY
+        hi = lo + page_size
+        if by is None:
+            return positions[lo:hi]
+        # only the first hi rows in sort order are needed
+        return self.ranker(by, ascending).top_k(positions, hi)[lo:]
+
+    def page(self, positions, columns, by=None, ascending=True, page=0, page_size=DEFAULT_PAGE_SIZE):
+        # one page of the displayed columns as an Arrow table, or as a
+        # DataFrame when pyarrow is missing
+        pos = self.page_positions(positions, by, ascending, page, page_size)
+        columns = [c for c in columns if c in self.df.columns]
+        rows = self.df.iloc[pos][columns]
+        if pa is None:
+            return rows.reset_index(drop=True)
+        return pa.Table.from_pandas(rows, preserve_index=False)
+
+
+def n_pages(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+
+def show(view, positions, columns, key, sortable=True, page_size=DEFAULT_PAGE_SIZE):
+    # paged table widget (Streamlit apps only); key prefixes the widget keys
+    import streamlit as st
+
+    import profiling
+
+    positions = np.asarray(positions, dtype=np.int64)
+    columns = [c for c in columns if c in view.df.columns]
+    by, ascending = None, True
+    pager = len(positions) > PAGE_SIZES[0]
+    if sortable or pager:
+        left, mid, right = st.columns(3)
+        if sortable:
+            choice = left.selectbox("Sort by", [GIVEN_ORDER] + columns, key=f'{key}.sort')
+            by = None if choice == GIVEN_ORDER else choice
+            ascending = mid.radio("Order", ["Ascending", "Descending"], horizontal=True,
+                                  key=f'{key}.order', disabled=by is None) == "Ascending"
+        if pager:
+            page_size = right.selectbox("Rows per page", PAGE_SIZES,
+                                        index=PAGE_SIZES.index(page_size), key=f'{key}.size')
+    pages = n_pages(len(positions), page_size)
+    page = 1
+    if pages > 1:
+        # a narrower query may leave the remembered page past the end
+        if st.session_state.get(f'{key}.page', 1) > pages:
+            st.session_state[f'{key}.page'] = pages
+        page = st.number_input(f"Page (of {pages})", 1, pages, key=f'{key}.page')
+    table = view.page(positions, columns, by, ascending, page - 1, page_size)
+    with profiling.span('render.page', key=key):
+        profiling.shipped(table)
+        st.dataframe(table, hide_index=True)
+    if pages > 1:
+        first = (page - 1) * page_size
+        st.caption(f"Rows {first + 1}–{first + len(table)} of {len(positions)}")
@@ -0,0 +1,138 @@
+# Multi-resolution rollups of the bloom emissions log.
+#
+# The raw log has one CodeCarbon record every second or so per run, with
+# cumulative counters. Charting it directly ships thousands of rows per run.
+# Here each run is resampled once per source version onto fixed buckets of
+# elapsed run time (the log's `duration` column) at several resolutions:
+#   cumulative counters   value at the end of the bucket (max)
+#   *_interval            what the bucket added (difference of the above)
+#   *_power               mean power reading (W) over the bucket
+# Every level is its own memory-mapped snapshot, built from the next finer
+# level rather than the raw log, and a RollupStore answers "these projects at
+# most N points per run" by picking the finest level that keeps every
+# selected run within N points (the coarsest one when none does) and reading
+# the projects' rows through a TokenIndex instead of scanning.
+import numpy as np
+import pandas as pd
+
+import ingest
+from emissions import EMISSIONS_COL
+from indexes import TokenIndex
+from snapshot import load_snapshot
+
+# bucket widths in seconds of elapsed run time, finest first
+LEVELS = (10, 60, 300, 1800)
+ROLLUP_VERSION = 1
+
+RUN_KEYS = ['project_name', 'run_id']
+COUNTER_COLS = [EMISSIONS_COL, 'energy_consumed', 'cpu_energy', 'gpu_energy', 'ram_energy']
+POWER_COLS = ['cpu_power', 'gpu_power', 'ram_power']
+
+
+def _interval(frame, cols):
+    # per-bucket increments of the cumulative counters within each run; the
+    # first bucket of a run counts from zero
+    prev = frame.groupby(RUN_KEYS, sort=False, observed=True)[cols].shift(1).fillna(0.0)
+    for col in cols:
+        frame[f'{col}_interval'] = frame[col] - prev[col]
+    return frame
+
+
+def _finish(frame, width):
+    frame = frame.reset_index().sort_values(RUN_KEYS + ['bucket'], kind='stable', ignore_index=True)
+    frame['elapsed_s'] = (frame['bucket'] * width).astype(np.float64)
+    frame = _interval(frame, [c for c in COUNTER_COLS if c in frame.columns])
+    for col in RUN_KEYS:
+        frame[col] = frame[col].astype('category')
+    return frame
+
+
+def rollup_raw(em, width=LEVELS[0]):
+    # finest level straight from the cleaned log (ingest.load_emissions)
+    counters = [c for c in COUNTER_COLS if c in em.columns]
+    powers = [c for c in POWER_COLS if c in em.columns]
+    em = em[RUN_KEYS + ['duration', 'timestamp'] + counters + powers].copy()
+    for col in ['duration'] + counters + powers:
+        em[col] = pd.to_numeric(em[col], errors='coerce')
+    # the log has stray header/garbage rows with no elapsed time
+    em = em.dropna(subset=RUN_KEYS + ['duration'])
+    em['bucket'] = (em['duration'] // width).astype(np.int64)
+    em['timestamp'] = pd.to_datetime(em['timestamp'], errors='coerce')
+    grouped = em.groupby(RUN_KEYS + ['bucket'], sort=False, observed=True)
+    frame = grouped[counters].max()
+    for col in powers:
+        frame[col] = grouped[col].mean()
+    frame['n_records'] = grouped.size()
+    frame['start'] = grouped['timestamp'].min()
+    return _finish(frame, width)
+
+
+def coarsen(fine, fine_width, width):
+    # next level from a finer one: counters keep their max, power readings
+    # are averaged weighted by how many raw records each fine bucket holds
+    counters = [c for c in COUNTER_COLS if c in fine.columns]
+    powers = [c for c in POWER_COLS if c in fine.columns]
+    fine = fine[RUN_KEYS + ['bucket', 'n_records', 'start'] + counters + powers].copy()
+    fine['bucket'] = fine['bucket'] * fine_width // width
+    for col in powers:
+        fine[col] = fine[col] * fine['n_records']
+    grouped = fine.groupby(RUN_KEYS + ['bucket'], sort=False, observed=True)
+    frame = grouped[counters].max()
+    frame['n_records'] = grouped['n_records'].sum()
+    for col in powers:
+        # min_count keeps NaN where no reading at all was logged
+        frame[col] = grouped[col].sum(min_count=1) / frame['n_records']
+    frame['start'] = grouped['start'].min()
+    return _finish(frame, width)
+
+
+def load_level(width, path=ingest.EMISSIONS_CSV):
+    # one resolution as a memory-mapped snapshot; each level is derived from
+    # the next finer one, so only the finest ever reads the raw log
+    i = LEVELS.index(width)
+    if i == 0:
+        build = lambda p: rollup_raw(ingest.load_emissions(p), width)
+    else:
+        build = lambda p: coarsen(load_level(LEVELS[i - 1], p), LEVELS[i - 1], width)
+    return load_snapshot(path, f'rollup{width}s', build,
+                         version=f'{ingest.CLEANER_VERSION}.{ROLLUP_VERSION}')
+
+
+class RollupStore:
+
+    def __init__(self, path=ingest.EMISSIONS_CSV, levels=LEVELS):
+        self.levels = {w: load_level(w, path) for w in levels}
+        self.index = {w: TokenIndex.from_values(f['project_name']) for w, f in self.levels.items()}
+        finest = self.levels[min(levels)]
+        # per-project longest run, to size queries without touching the rows
+        self.run_span = finest.groupby('project_name', observed=True)['elapsed_s'].max() + min(levels)
+        self.runs = (finest.groupby(RUN_KEYS, observed=True)
+                     .agg(start=('start', 'min'), elapsed_s=('elapsed_s', 'max'),
+                          n_records=('n_records', 'sum'),
+                          **{c: (c, 'max') for c in COUNTER_COLS if c in finest.columns})
+                     .reset_index())
+
+    def projects(self):
+        return sorted(str(p) for p in self.run_span.index)
+
+    def level_for(self, projects, max_points=500):
+        # finest resolution keeping every selected run within max_points
+        span = self.run_span.reindex(projects).max()
+        if not np.isfinite(span):
+            return max(self.levels)
+        for width in sorted(self.levels):
+            if span / width <= max_points:
+                return width
+        return max(self.levels)
+
+    def series(self, projects, max_points=500, level=None):
+        # -> (rows of the selected projects at one resolution, bucket width)
+        level = level or self.level_for(projects, max_points)
+        frame = self.levels[level]
+        return frame.iloc[self.index[level].any_of(projects)], level
+
+    def totals(self, projects=None):
+        # final counter values per project (sum over its runs)
+        runs = self.runs if projects is None else self.runs[self.runs['project_name'].isin(projects)]
+        cols = [c for c in COUNTER_COLS if c in runs.columns]
+        return runs.groupby('project_name', observed=True)[cols].sum(min_count=1)
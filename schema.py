@@ -0,0 +1,103 @@
+# Compact in-memory schema for the model tables.
+#
+# Every Streamlit worker holds its own copy of the cleaned frames, so their
+# footprint sets how many workers fit on a host. The schema declares, per
+# column of the data dictionary (ai_models_data_dictionary.csv):
+#   - 'category': low-cardinality labels (task, domain, organization, ...)
+#   - 'lazy':     long free text (abstract, authors, *notes) kept in the
+#                 snapshot but only loaded when a view displays it
+#   - 'text':     everything else that stays a plain string column
+# Numeric columns are downcast to float32 / smaller ints only when the
+# round trip is exact.
+import numpy as np
+import pandas as pd
+
+AI_DICTIONARY_CSV = 'ai_models_data_dictionary.csv'
+
+CATEGORY_FIELDS = {
+    'domain', 'task', 'organization', 'model_accessibility',
+    'country_(from_organization)', 'training_hardware', 'training_dataset',
+    'training_code_accessibility', 'dataset_accessibility',
+    'organization_categorization_(from_organization)',
+    # notable_ai_models.csv spellings (regex normalizer)
+    'organization_categorization', 'country__of_organization_', 'confidence',
+    'notability_criteria', 'inference_code_accessibility', 'base_model',
+}
+LAZY_FIELDS = {'abstract', 'authors'}
+
+# undeclared string columns become categoricals below this distinct ratio
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _normalize(columns):
+    return pd.Index(columns).str.strip().str.lower().str.replace(' ', '_')
+
+
+def load_dictionary(path=AI_DICTIONARY_CSV):
+    dd = pd.read_csv(path)
+    dd.columns = _normalize(dd.columns)
+    dd['field'] = _normalize(dd['column'])
+    return dd
+
+
+def field_roles(columns, dictionary=None):
+    # column -> 'category' | 'lazy' | 'text' for the string columns; numeric
+    # columns are not listed (see downcast_numeric)
+    if dictionary is None:
+        dictionary = load_dictionary()
+    notes = {
+        f for f, d in zip(dictionary['field'], dictionary['description'].fillna(''))
+        if 'notes' in d.lower() or d.lower().startswith('additional') or d.lower().startswith('summary')
+    }
+    roles = {}
+    for col in columns:
+        if col in LAZY_FIELDS or col in notes or col.rstrip('_').endswith('notes'):
+            roles[col] = 'lazy'
+        elif col in CATEGORY_FIELDS:
+            roles[col] = 'category'
+        else:
+            roles[col] = 'text'
+    return roles
+
+
+def downcast_numeric(s):
+    # smallest dtype that round-trips every value exactly
+    values = s.to_numpy()
+    if s.dtype.kind == 'f':
+        finite = values[~np.isnan(values)]
+        if len(finite) == len(values) and len(finite) and np.array_equal(finite, np.round(finite)):
+            as_int = pd.to_numeric(s, downcast='integer')
+            if np.array_equal(as_int.to_numpy(dtype=np.float64), values):
+                return as_int
+        as_f32 = values.astype(np.float32)
+        if np.array_equal(as_f32.astype(np.float64), values, equal_nan=True):
+            return pd.Series(as_f32, index=s.index, name=s.name)
+        return s
+    if s.dtype.kind in 'iu':
+        return pd.to_numeric(s, downcast='integer' if s.dtype.kind == 'i' else 'unsigned')
+    return s
+
+
+def apply_schema(df, dictionary=None):
+    # compact dtypes in place of the cleaned frame's defaults; lazy columns
+    # are left as strings here and excluded at load time (ingest.py)
+    strings = [c for c in df.columns
+               if pd.api.types.is_string_dtype(df[c]) or df[c].dtype == object]
+    roles = field_roles(strings, dictionary)
+    for col in df.columns:
+        s = df[col]
+        if col in roles:
+            role = roles[col]
+            if role == 'text' and len(s) and s.nunique() <= CATEGORY_MAX_RATIO * len(s):
+                role = 'category'
+            # mixed object columns (e.g. True/NaN flags) stay as they are
+            if role == 'category' and pd.api.types.is_string_dtype(s):
+                df[col] = s.astype('category')
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            df[col] = downcast_numeric(s)
+    return df
+
+
+def lazy_columns(columns, dictionary=None):
+    roles = field_roles(columns, dictionary)
+    return [c for c in columns if roles.get(c) == 'lazy']
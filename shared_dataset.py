@@ -0,0 +1,102 @@
+# Host-wide, read-only sharing of the cleaned tables.
+#
+# st.cache_data pickles its return value and hands every session its own
+# unpickled copy, and every worker process repeats the load. Instead, the
+# first process to need a table publishes it as an uncompressed Arrow IPC
+# file in shared memory (/dev/shm), and every session and worker on the host
+# memory-maps that file. Numeric columns are stored without validity bitmaps
+# (missing values stay NaN) so pandas can wrap the mapped buffers directly,
+# read-only and without copying; the pages are shared through the OS page
+# cache. Apps hold the attached frame in st.cache_resource, which returns the
+# same object to every session.
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX; publishing is still atomic, just unlocked
+    fcntl = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # without pyarrow every process keeps its own copy
+    pa = None
+
+
+def _default_dir():
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'bass-ml')
+
+
+SHARED_DIR = os.environ.get('BASS_SHARED_DIR') or _default_dir()
+
+
+def shared_path(name, version):
+    return os.path.join(SHARED_DIR, f"{name}.{version}.arrow")
+
+
+def to_shared_table(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if values.dtype.kind in 'fiu':
+            # keep NaN as NaN instead of a null bitmap so the column can be
+            # mapped back zero-copy
+            arr = pa.array(values.to_numpy(), from_pandas=False)
+            table = table.set_column(i, table.schema.field(i).with_type(arr.type), arr)
+    return table
+
+
+def publish(name, version, df):
+    os.makedirs(SHARED_DIR, exist_ok=True)
+    path = shared_path(name, version)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    table = to_shared_table(df)
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    _drop_other_versions(name, path)
+    return path
+
+
+def attach(path):
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks keeps one block per column, so NaN-filled numeric columns
+    # are views of the mapped file rather than a consolidated copy
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def _drop_other_versions(name, keep):
+    # unlinking is safe while other processes still map an old version
+    for entry in os.listdir(SHARED_DIR):
+        full = os.path.join(SHARED_DIR, entry)
+        if entry.startswith(name + '.') and entry.endswith('.arrow') and full != keep:
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+
+
+def shared_frame(name, version, build):
+    # attach to the published table for (name, version), publishing it from
+    # build() first if no process on this host has done so yet
+    if pa is None:
+        return build()
+    path = shared_path(name, version)
+    if not os.path.exists(path):
+        try:
+            os.makedirs(SHARED_DIR, exist_ok=True)
+            with open(os.path.join(SHARED_DIR, f"{name}.lock"), 'w') as lock:
+                if fcntl is not None:
+                    # one builder per table; the others wait, then attach
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                if not os.path.exists(path):
+                    publish(name, version, build())
+        except OSError:
+            return build()
+    try:
+        return attach(path)
+    except (OSError, pa.ArrowInvalid):
+        return build()
@@ -0,0 +1,161 @@
+# "Like model X, but cheaper to train": nearest neighbours over the models table.
+#
+# Each row is described by two feature blocks, built once per dataset version:
+#   numeric  log10 of parameters, compute, dataset size, power and training
+#            time, standardized per column; a missing value sits at the mean
+#   text     TF-IDF of the task and domain labels and of the abstract words,
+#            L2-normalized per row
+# The distance between rows a and b is
+#   d² = TEXT_WEIGHT · |t_a - t_b|² + NUMERIC_WEIGHT · |z_a - z_b|² / n_numeric
+# and only needs dot products: the text one through term postings (sparse,
+# so a query touches only the rows sharing a term with it), the numeric one
+# as a matrix-vector product. A query is one pass over the table in NumPy,
+# then the cheaper rows are cut out and the k closest kept.
+import numpy as np
+import pandas as pd
+
+from indexes import EMPTY
+
+NUMERIC_FEATURES = [
+    'parameters', 'training_compute_(flop)', 'training_dataset_size_(datapoints)',
+    'training_power_(watts)', 'training_time_(hours)',
+]
+# multi-valued label columns, each label one term, weighted over abstract words
+LABEL_FEATURES = {'task': 2.0, 'domain': 1.0}
+WORD_WEIGHT = 1.0
+TEXT_WEIGHT = 0.5
+NUMERIC_WEIGHT = 0.5
+
+DEFAULT_COST = 'training_energy_(kwh)'
+
+# terms in fewer rows than this cannot make two rows closer; terms in more
+# than MAX_DF of the rows carry no information (stop words)
+MIN_DF = 2
+MAX_DF = 0.5
+WORD_PATTERN = r'[a-z][a-z0-9\-]{2,}'
+
+
+def numeric_features(df, cols=NUMERIC_FEATURES):
+    # (n_rows, n_cols) float32 standardized log10 values, 0 where missing
+    cols = [c for c in cols if c in df.columns]
+    out = np.zeros((len(df), len(cols)), dtype=np.float32)
+    for j, col in enumerate(cols):
+        values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logs = np.where(values > 0, np.log10(values), np.nan)
+        known = ~np.isnan(logs)
+        if known.sum() < 2:
+            continue
+        std = logs[known].std() or 1.0
+        out[known, j] = (logs[known] - logs[known].mean()) / std
+    return out
+
+
+def _label_terms(df, col, weight):
+    if col not in df.columns:
+        return None
+    values = pd.Series(np.asarray(df[col], dtype=object)).dropna().astype(str)
+    terms = values.str.split(',').explode().str.strip().str.lower()
+    terms = terms[terms != '']
+    return pd.DataFrame({'row': terms.index.to_numpy(dtype=np.int64),
+                         'term': (f'{col}:' + terms).to_numpy(dtype=object), 'weight': weight})
+
+
+def _word_terms(text, weight):
+    # each distinct text is tokenized once, then joined back to its rows
+    codes, uniques = pd.factorize(pd.Series(np.asarray(text, dtype=object)))
+    words = pd.Series(uniques, dtype=object).astype(str).str.lower().str.findall(WORD_PATTERN).explode().dropna()
+    words = pd.DataFrame({'text': words.index.to_numpy(dtype=np.int64), 'term': words.to_numpy(dtype=object)})
+    rows = pd.DataFrame({'text': codes, 'row': np.arange(len(codes), dtype=np.int64)})
+    return rows.merge(words, on='text')[['row', 'term']].assign(weight=weight)
+
+
+def tfidf(df, text=None):
+    # -> (row, term code, weight) triples of the row-normalized TF-IDF
+    # matrix, sorted by term, plus the vocabulary size
+    parts = [_label_terms(df, col, w) for col, w in LABEL_FEATURES.items()]
+    if text is not None:
+        parts.append(_word_terms(text, WORD_WEIGHT))
+    parts = [p for p in parts if p is not None and len(p)]
+    if not parts:
+        return EMPTY, EMPTY, np.empty(0, dtype=np.float32), 0
+    terms = pd.concat(parts, ignore_index=True)
+    # label terms carry their column as a prefix, so a term has one weight
+    codes, vocab = pd.factorize(terms['term'])
+    field_weight = np.zeros(len(vocab))
+    field_weight[codes] = terms['weight'].to_numpy(dtype=np.float64)
+    n_rows = len(df)
+    keys, tf = np.unique(terms['row'].to_numpy(dtype=np.int64) * len(vocab) + codes, return_counts=True)
+    rows, codes = keys // len(vocab), keys % len(vocab)
+    doc_freq = np.bincount(codes, minlength=len(vocab))
+    keep = (doc_freq >= MIN_DF) & (doc_freq <= MAX_DF * n_rows)
+    # renumber the surviving terms 0..n_terms-1
+    remap = np.cumsum(keep) - 1
+    live = keep[codes]
+    rows, codes, tf = rows[live], codes[live], tf[live]
+    # sublinear tf, smoothed idf, field weight
+    w = ((1 + np.log(tf)) * (np.log((1 + n_rows) / (1 + doc_freq[codes])) + 1)
+         * field_weight[codes])
+    norms = np.sqrt(np.bincount(rows, weights=w * w, minlength=n_rows))
+    w = w / norms[rows]
+    codes = remap[codes]
+    order = np.argsort(codes, kind='stable')
+    return rows[order], codes[order], w[order].astype(np.float32), int(keep.sum())
+
+
+class SimilarIndex:
+
+    def __init__(self, df, text=None):
+        # text: optional free-text Series (abstracts) row-aligned with df
+        self.df = df
+        self.n_rows = len(df)
+        self.z = numeric_features(df)
+        self.zz = (self.z * self.z).sum(axis=1)
+        rows, codes, weights, n_terms = tfidf(df, text)
+        # term postings (CSC) for scoring, row -> terms (CSR) for queries
+        self.term_ptr = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=n_terms))])
+        self.term_rows, self.term_weights = rows, weights
+        by_row = np.argsort(rows, kind='stable')
+        self.row_ptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=self.n_rows))])
+        self.row_terms, self.row_weights = codes[by_row], weights[by_row]
+        self.has_text = np.diff(self.row_ptr) > 0
+
+    def text_similarity(self, pos):
+        # cosine similarity of row pos's text vector to every row
+        sim = np.zeros(self.n_rows, dtype=np.float32)
+        lo, hi = self.row_ptr[pos], self.row_ptr[pos + 1]
+        for term, w in zip(self.row_terms[lo:hi], self.row_weights[lo:hi]):
+            a, b = self.term_ptr[term], self.term_ptr[term + 1]
+            sim[self.term_rows[a:b]] += w * self.term_weights[a:b]
+        return sim
+
+    def distances(self, pos):
+        # squared distance from row pos to every row (see module comment);
+        # a row without any text is as far as possible on the text block
+        text = np.maximum(2.0 - 2.0 * self.text_similarity(pos), 0.0)
+        text[~self.has_text] = 2.0
+        if not self.has_text[pos]:
+            text[:] = 2.0
+        d2 = TEXT_WEIGHT * text
+        if self.z.shape[1]:
+            num = self.zz[pos] + self.zz - 2.0 * (self.z @ self.z[pos])
+            d2 += NUMERIC_WEIGHT * np.maximum(num, 0.0) / self.z.shape[1]
+        return d2
+
+    def nearest(self, pos, k=5, cheaper_by=None):
+        # -> (positions, distances) of the k rows closest to row pos, closest
+        # first; with cheaper_by, only rows whose value in that column is
+        # known and below row pos's
+        d2 = self.distances(pos)
+        mask = np.ones(self.n_rows, dtype=bool)
+        mask[pos] = False
+        if cheaper_by is not None:
+            cost = pd.to_numeric(self.df[cheaper_by], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            mask &= cost < cost[pos]  # NaN compares False on either side
+        cand = np.flatnonzero(mask)
+        if k <= 0 or not len(cand):
+            return EMPTY, np.empty(0, dtype=np.float32)
+        if len(cand) > k:
+            cand = cand[np.argpartition(d2[cand], k - 1)[:k]]
+        cand = cand[np.argsort(d2[cand], kind='stable')]
+        return cand, np.sqrt(d2[cand])
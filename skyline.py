@@ -0,0 +1,101 @@
+# Pareto-skyline recommendations per task / domain token.
+#
+# The default ranking sorts by power, then parameters, so a model that is a
+# little hungrier but far cheaper in compute or carbon never shows up. The
+# skyline keeps every model that no other model beats on all objectives at
+# once (lower power, energy, carbon, parameters, compute; more citations).
+#
+# Skylines are computed once per token of a TokenIndex when the data loads.
+# The slider limits are upper bounds on minimized objectives, so anything
+# that dominates a row within the limits is itself within them. The
+# constrained skyline is therefore just the precomputed skyline filtered by
+# the limits, and a query only ever looks at skyline rows.
+import numpy as np
+import pandas as pd
+
+from indexes import EMPTY
+
+# candidates compared per vectorized step when building a skyline
+SKYLINE_BLOCK = 256
+
+# (column, 'min' | 'max'); columns missing from a frame are skipped
+MODEL_OBJECTIVES = [
+    ('training_power_(watts)', 'min'), ('training_energy_(kwh)', 'min'),
+    ('carbon_emissions_(kg_co2)', 'min'), ('parameters', 'min'),
+    ('training_compute_(flop)', 'min'), ('citations', 'max'),
+]
+
+
+def objective_ranks(df, objectives):
+    # (n_rows, n_objectives) dense ranks where smaller is better on every
+    # axis; a missing value ranks worst, so unknowns never dominate
+    cols = []
+    for col, sense in objectives:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+        if sense == 'max':
+            values = -values
+        values = np.where(np.isnan(values), np.inf, values)
+        cols.append(pd.Series(values).rank(method='dense').to_numpy(dtype=np.int64))
+    if not cols:
+        return np.zeros((len(df), 0), dtype=np.int64)
+    return np.column_stack(cols)
+
+
+def skyline(ranks, positions):
+    # non-dominated subset of positions (sorted). Sort-filter-skyline: after
+    # sorting by the sum of ranks, a row can only be dominated by rows
+    # before it, so each row is checked against the skyline found so far
+    positions = np.asarray(positions, dtype=np.int64)
+    if len(positions) <= 1 or ranks.shape[1] == 0:
+        return np.sort(positions)
+    pts = ranks[positions]
+    order = np.argsort(pts.sum(axis=1), kind='stable')
+    pts, positions = pts[order], positions[order]
+    front = pts[:0]
+    keep = []
+    # blocks of candidates are checked against the front and each other at
+    # once; a dominated row's dominator is always in the front or its block
+    for start in range(0, len(pts), SKYLINE_BLOCK):
+        block = pts[start:start + SKYLINE_BLOCK]
+        alive = ~_dominated(block, front)
+        block = block[alive]
+        inner = ~_dominated(block, block)
+        idx = np.flatnonzero(alive)[inner] + start
+        keep.append(idx)
+        front = np.concatenate([front, pts[idx]])
+    return np.sort(positions[np.concatenate(keep)])
+
+
+def _dominated(points, by):
+    # mask over points: some row of `by` is <= on every axis and < on one
+    if not len(by) or not len(points):
+        return np.zeros(len(points), dtype=bool)
+    le = (by[None, :, :] <= points[:, None, :]).all(axis=2)
+    lt = (by[None, :, :] < points[:, None, :]).any(axis=2)
+    return (le & lt).any(axis=1)
+
+
+class SkylineIndex:
+
+    def __init__(self, df, objectives, token_index):
+        self.ranks = objective_ranks(df, objectives)
+        self.token_index = token_index
+        # token -> skyline positions of that token's rows
+        self.by_token = {tok: skyline(self.ranks, pos) for tok, pos in token_index.postings.items()}
+        self._text_cache = {}
+
+    def get(self, token):
+        return self.by_token.get(token, EMPTY)
+
+    def containing(self, text):
+        # skyline of the rows TokenIndex.containing(text) returns: the
+        # skyline of a union is the skyline of the per-token skylines
+        key = text.lower()
+        hit = self._text_cache.get(key)
+        if hit is None:
+            parts = [self.by_token[t] for t in self.token_index.tokens_containing(text)]
+            hit = skyline(self.ranks, np.unique(np.concatenate(parts))) if parts else EMPTY
+            self._text_cache[key] = hit
+        return hit
@@ -0,0 +1,103 @@
+# Columnar snapshot cache for the cleaned CSV tables.
+#
+# The first load of a source CSV parses and cleans it as usual, then writes the
+# typed result to an uncompressed Arrow IPC (Feather v2) file next to the
+# source. Later loads memory-map that file instead of re-parsing the CSV. The
+# snapshot name embeds a fingerprint of the source (size + mtime) and the
+# cleaner version, so editing the CSV or the cleaning code invalidates it.
+import hashlib
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; fall back to plain CSV parsing
+    pa = None
+    feather = None
+
+CACHE_DIR = os.environ.get('BASS_CACHE_DIR', '.bass_cache')
+
+
+def cache_dir_for(path):
+    base = os.path.dirname(os.path.abspath(path))
+    return os.path.join(base, CACHE_DIR)
+
+
+def source_fingerprint(path):
+    st = os.stat(path)
+    key = f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def snapshot_path(path, kind, version=1):
+    # path may also be a tuple of sources combined into one table; the
+    # snapshot then lives next to the first and changes with any of them
+    if isinstance(path, (list, tuple)):
+        fingerprint = hashlib.sha1(':'.join(source_fingerprint(p) for p in path).encode()).hexdigest()[:16]
+        name = f"{kind}.sources.v{version}.{fingerprint}.arrow"
+        return os.path.join(cache_dir_for(path[0]), name)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"{stem}.{kind}.v{version}.{source_fingerprint(path)}.arrow"
+    return os.path.join(cache_dir_for(path), name)
+
+
+def read_snapshot(snap, columns=None):
+    # memory_map avoids reading the file into a private buffer; numeric
+    # columns are then materialized straight from the mapped pages
+    table = feather.read_table(snap, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def write_snapshot(df, snap):
+    os.makedirs(os.path.dirname(snap), exist_ok=True)
+    tmp = f"{snap}.{os.getpid()}.tmp"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    feather.write_feather(table, tmp, compression='uncompressed')
+    # atomic rename so concurrent workers never see a half-written file
+    os.replace(tmp, snap)
+
+
+def _drop_stale(snap):
+    folder = os.path.dirname(snap)
+    prefix = '.'.join(os.path.basename(snap).split('.')[:2]) + '.'
+    for name in os.listdir(folder):
+        full = os.path.join(folder, name)
+        if name.startswith(prefix) and name.endswith('.arrow') and full != snap:
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+
+
+def _select(columns, include, exclude):
+    if include is not None:
+        return [c for c in columns if c in include]
+    if exclude is not None:
+        dropped = set(exclude(list(columns)))
+        return [c for c in columns if c not in dropped]
+    return None
+
+
+def load_snapshot(path, kind, build, version=1, columns=None, exclude=None):
+    # build(path) -> cleaned DataFrame; only called on a snapshot miss.
+    # columns: only load these; exclude: callable(all columns) -> columns to
+    # leave on disk (e.g. long free text that is loaded on demand)
+    if feather is None:
+        df = build(path)
+        keep = _select(df.columns, columns, exclude)
+        return df if keep is None else df[keep]
+    snap = snapshot_path(path, kind, version)
+    if os.path.exists(snap):
+        try:
+            names = pa.ipc.open_file(pa.memory_map(snap)).schema.names
+            return read_snapshot(snap, columns=_select(names, columns, exclude))
+        except (OSError, pa.ArrowInvalid):
+            pass  # corrupt or truncated snapshot; rebuild it below
+    df = build(path)
+    try:
+        write_snapshot(df, snap)
+        _drop_stale(snap)
+    except (OSError, pa.ArrowException):
+        pass  # read-only checkout etc.; the cleaned frame is still valid
+    keep = _select(df.columns, columns, exclude)
+    return df if keep is None else df[keep]
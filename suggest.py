@@ -0,0 +1,114 @@
+# The Suggest query as a pure function of the dataset and the widget values.
+#
+# SuggestEngine bundles a loaded table with the structures built once per
+# dataset version (task index, pre-ranked order) and memoizes results in a
+# QueryCache of its own keyed on (version, task, power, params, co2, topk).
+# The engine is shared by every session (st.cache_resource, core.Dataset),
+# so its cache is too; the entries of a replaced version go with its engine,
+# and two live engines (a hot swap, or api.py next to an app) never evict
+# each other's results.
+# With pareto=True the candidates are the task's precomputed Pareto skyline
+# (skyline.py) instead of all of its rows. The slider limits are answered
+# from per-column range indexes (indexes.RangeIndex) built with the engine.
+# similar() answers "models like this one but cheaper" from a
+# nearest-neighbour index (similar.py), built on the first similar() call so
+# views that never ask for it do not pay for it.
+
+import threading
+
+import profiling
+from indexes import RangeIndex, TokenIndex, filter_ranges
+from query_cache import QueryCache
+from ranking import TopKRanker
+from similar import DEFAULT_COST, SimilarIndex
+from skyline import MODEL_OBJECTIVES, SkylineIndex
+
+POWER_COL = 'training_power_(watts)'
+PARAMS_COL = 'parameters'
+CO2_COL = 'carbon_emissions_(kg_co2)'
+RANK_BY = [POWER_COL, PARAMS_COL]
+RANGE_COLS = [POWER_COL, PARAMS_COL, CO2_COL]
+
+# per engine
+RESULT_CACHE_SIZE = 2048
+RESULT_CACHE_TTL = 3600
+
+
+def suggest_positions(df, task_index, ranker, task, power, params, co2=None, topk=5, ranges=None):
+    # row positions of the top-k models for task under the power (W),
+    # parameter (billions) and optional CO2 (kg) limits. task_index may also
+    # be a SkylineIndex: the limits then filter the task's skyline rows.
+    # ranges: optional {column: RangeIndex}; without it the limits are
+    # checked against every row of the task
+    with profiling.span('suggest.filter') as sp:
+        pos = task_index.containing(task)
+        limits = {POWER_COL: power, PARAMS_COL: params * 1e9}
+        if co2 is not None:
+            limits[CO2_COL] = co2
+        if ranges is not None:
+            pos = filter_ranges(pos, ranges, limits)
+        else:
+            for col, limit in limits.items():
+                pos = pos[df[col].to_numpy()[pos] <= limit]
+        sp.set(matched=len(pos))
+    with profiling.span('suggest.rank'):
+        return ranker.top_k(pos, topk)
+
+
+class SuggestEngine:
+
+    def __init__(self, df, version, cache=None, text=None):
+        # text: optional abstracts row-aligned with df, for similar()
+        self.df = df
+        self.version = version
+        self.cache = cache if cache is not None else QueryCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+        self.task_index = TokenIndex.from_values(df['task'])
+        self.ranker = TopKRanker(df, RANK_BY, na_position='last')
+        self.skyline = SkylineIndex(df, MODEL_OBJECTIVES, self.task_index)
+        self.ranges = {col: RangeIndex(df[col]) for col in RANGE_COLS if col in df.columns}
+        self.text = text
+        self._similar_index = None
+        self._similar_lock = threading.Lock()
+
+    @property
+    def similar_index(self):
+        if self._similar_index is None:
+            with self._similar_lock:
+                if self._similar_index is None:
+                    self._similar_index = SimilarIndex(self.df, self.text)
+        return self._similar_index
+
+    def suggest_positions(self, task, power, params, co2=None, topk=5, pareto=False):
+        key = (self.version, task, power, params, co2, topk, pareto)
+
+        def compute():
+            profiling.cache_miss()
+            index = self.skyline if pareto else self.task_index
+            return suggest_positions(self.df, index, self.ranker,
+                                     task, power, params, co2, topk, self.ranges)
+
+        with profiling.cached('suggest.query'):
+            pos = self.cache.get_or_compute(key, compute)
+        pos.flags.writeable = False
+        return pos
+
+    def suggest(self, task, power, params, co2=None, topk=5, pareto=False):
+        return self.df.iloc[self.suggest_positions(task, power, params, co2, topk, pareto)]
+
+    def similar_positions(self, pos, topk=5, cheaper_by=DEFAULT_COST):
+        # (positions, distances) of the models closest to row pos among those
+        # cheaper in cheaper_by (None: any), closest first
+        key = (self.version, 'similar', int(pos), topk, cheaper_by)
+
+        def compute():
+            profiling.cache_miss()
+            return self.similar_index.nearest(pos, topk, cheaper_by)
+
+        with profiling.cached('suggest.similar'):
+            found, dist = self.cache.get_or_compute(key, compute)
+        found.flags.writeable = dist.flags.writeable = False
+        return found, dist
+
+    def similar(self, pos, topk=5, cheaper_by=DEFAULT_COST):
+        found, dist = self.similar_positions(pos, topk, cheaper_by)
+        return self.df.iloc[found].assign(distance=dist)
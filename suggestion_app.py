@@ -59,27 +59,50 @@
 
 
 # Streamlit app for AI model suggestion
-import pandas as pd
 import streamlit as st
 
+import background
+import catalog
+import profiling
+import result_view
+from shared_dataset import shared_frame
+from suggest import SuggestEngine
+
+# Opt-in per-rerun timing (profiling.py): BASS_PROFILE=1|otlp or the toggle
+tracer = profiling.start('suggestion_app', profiling.env_format() or (
+    'jsonl' if st.sidebar.toggle("Profile reruns", help="Time each stage of this page and log the spans") else None
+))
+
 # Cache data loading for performance
-@st.cache_data
-def load_data():
-    df = pd.read_csv('large_scale_ai_models_added_cols.csv')
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    # Convert numeric fields
-    numeric_cols = [
-        'training_power_(watts)', 'parameters', 'training_compute_(flop)',
-        'training_dataset_size_(datapoints)', 'training_time_(hours)',
-        'hardware_quantity', 'finetune_compute_(flop)'
-    ]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    return df
+@st.cache_resource(max_entries=2)
+def load_data(version):
+    profiling.cache_miss()
+    # one read-only copy per host in shared memory (the model catalog, same
+    # table as new_suggestion.load_models); version changes with any source
+    return shared_frame('catalog', version, catalog.load_catalog)
+
+@st.cache_resource(max_entries=2)
+def suggest_engine(version):
+    profiling.cache_miss()
+    # task index + pre-ranked order, with results memoized across sessions
+    return SuggestEngine(load_data(version), version)
+
+@st.cache_resource(max_entries=2)
+def result_pages(version):
+    # server-side sort and paging over the cached table (result_view.py)
+    return result_view.ResultView(load_data(version))
 
 # Load data
-df = load_data()
+version = catalog.catalog_version()
+with profiling.cached('load.models') as sp:
+    df = load_data(version)
+    sp.frame(df)
+with profiling.cached('build.engine'):
+    engine = suggest_engine(version)
+if st.session_state.get('data_version') not in (None, version):
+    changes = catalog.last_changes()
+    st.toast("Data updated" + (f": {changes}" if changes else ""))
+st.session_state['data_version'] = version
 
 # UI setup
 st.title("AI Model Suggestion Tool")
@@ -99,34 +122,45 @@ power_limit = st.slider(
 )
 param_limit = st.slider("Max Parameters (in billions)", 0, 1000, 1000)
 top_k = st.slider("Number of top suggestions", 1, 10, 5)
-
-# Filter & display suggestions
-def get_suggestions(task, power_lim, param_lim, k):
-    filtered = df[df['task'].str.contains(task, case=False, na=False)]
-    filtered = filtered[
-        (filtered['training_power_(watts)'] <= power_lim) &
-        (filtered['parameters'] <= param_lim * 1e9)
-    ]
-    if filtered.empty:
+pareto = st.radio(
+    "Ranking", ["Lowest power first", "Pareto trade-offs"], horizontal=True,
+    help="Pareto: only models no other model beats on power, energy, CO₂, parameters, compute and citations at once"
+) == "Pareto trade-offs"
+
+# Filter & display suggestions; the query runs on the shared background
+# pool, superseded slider positions are dropped (background.py)
+def get_suggestions(task, power_lim, param_lim, k, pareto=False):
+    pos = background.latest('suggestions', (version, task, power_lim, param_lim, k, pareto),
+                            lambda: engine.suggest_positions(task, power_lim, param_lim, None, k, pareto))
+    if not len(pos):
         return None
-    return filtered.sort_values(
-        ['training_power_(watts)', 'parameters']
-    ).head(k)
+    return pos
 
 # Generate suggestions on any widget change
-gsuggestion = get_suggestions(task_input, power_limit, param_limit, top_k)
+gsuggestion = get_suggestions(task_input, power_limit, param_limit, top_k, pareto)
 if gsuggestion is not None:
     st.success("Top Suggestions:")
-    st.dataframe(gsuggestion[[
+    shown = [
         'system', 'task', 'training_power_(watts)', 'parameters',
         'organization', 'training_compute_(flop)', 'training_time_(hours)'
-    ]])
-    st.download_button(
-        "Download suggestions as CSV", gsuggestion.to_csv(index=False),
-        file_name='suggested_models.csv', mime='text/csv'
-    )
+    ]
+    # only the displayed columns of the suggested rows go to the browser
+    result_view.show(result_pages(version), gsuggestion, shown, key='suggestions', sortable=False)
+    rows = df.iloc[gsuggestion]
+    csv = background.latest('download', (version, tuple(gsuggestion)), lambda: rows.to_csv(index=False))
+    with profiling.span('render.download'):
+        st.download_button(
+            "Download suggestions as CSV", csv,
+            file_name='suggested_models.csv', mime='text/csv'
+        )
 else:
     st.warning("No matching models found.")
+cache_stats = engine.cache.stats()
+st.caption(
+    f"Query cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+    f"({cache_stats['hit_rate']:.0%})"
+)
+profiling.panel(profiling.finish(tracer))
 
 
 
@@ -0,0 +1,67 @@
+# In-process tests of the HTTP service (api.py) on the bundled files.
+#
+#   python -m pytest test_api.py
+import io
+import os
+
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import core
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TASK = 'Language modelling'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # the loaders read the bundled CSVs relative to the repo root
+    monkeypatch.chdir(HERE)
+    monkeypatch.setattr(core, '_dataset', None)
+    with TestClient(api.app) as c:
+        yield c
+
+
+def test_health(client):
+    r = client.get('/health')
+    assert r.status_code == 200
+    body = r.json()
+    assert body['status'] == 'ok'
+    assert body['models'] == core.get_dataset().n_models() > 0
+
+
+def test_suggest_json(client):
+    r = client.get('/suggest', params={'task': TASK, 'topk': 3})
+    assert r.status_code == 200
+    rows = r.json()
+    assert 0 < len(rows) <= 3
+    assert set(rows[0]) <= set(core.SUGGEST_COLUMNS)
+    assert all(TASK.lower() in row['task'].lower() for row in rows)
+
+
+def test_suggest_arrow_matches_json(client):
+    params = {'task': TASK, 'topk': 5}
+    rows = client.get('/suggest', params=params).json()
+    r = client.get('/suggest', params={**params, 'format': 'arrow'})
+    assert r.status_code == 200
+    assert r.headers['content-type'] == api.ARROW_MEDIA_TYPE
+    table = pa.ipc.open_stream(io.BytesIO(r.content)).read_all()
+    assert table.column('system').to_pylist() == [row['system'] for row in rows]
+
+
+def test_similar_unknown_column(client):
+    system = client.get('/suggest', params={'task': TASK, 'topk': 1}).json()[0]['system']
+    r = client.get('/similar', params={'system': system, 'cheaper_by': 'no_such_column'})
+    assert r.status_code == 422
+
+
+def test_similar_not_available_with_duckdb(monkeypatch):
+    pytest.importorskip('duckdb')
+    monkeypatch.chdir(HERE)
+    monkeypatch.setenv('BASS_BACKEND', 'duckdb')
+    monkeypatch.setattr(core, '_dataset', None)
+    with TestClient(api.app) as c:
+        r = c.get('/similar', params={'system': 'GPT-3 175B (davinci)'})
+    assert r.status_code == 501
@@ -0,0 +1,19 @@
+# The DuckDB backend against the pandas one on the bundled files
+# (benchmarks/parity.py).
+#
+#   python -m pytest test_parity.py
+import os
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_backends_agree(monkeypatch, capsys):
+    pytest.importorskip('duckdb')
+    pytest.importorskip('pyarrow')
+    from benchmarks import parity
+
+    # the loaders read the bundled CSVs relative to the repo root
+    monkeypatch.chdir(HERE)
+    assert parity.main([]) == 0, capsys.readouterr().out
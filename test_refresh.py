@@ -0,0 +1,144 @@
+# Incremental rebuilds of the cleaned tables (refresh.py) on temp copies of
+# the bundled CSVs.
+#
+#   python -m pytest test_refresh.py
+import csv
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import catalog
+import ingest
+import refresh
+from schema import lazy_columns
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def rewrite(path, edit):
+    # edit(header, rows) on the CSV text, so untouched cells keep their
+    # exact spelling (a pandas round trip can respell floats)
+    with open(path, newline='', encoding='utf-8') as fh:
+        header, *rows = list(csv.reader(fh))
+    header, rows = edit(header, rows)
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        csv.writer(fh).writerows([header] + rows)
+    return header, rows
+
+
+def add_column(name, value):
+    return lambda header, rows: (header + [name], [r + [value] for r in rows])
+
+
+def drop_column(name):
+    def edit(header, rows):
+        i = header.index(name)
+        return header[:i] + header[i + 1:], [r[:i] + r[i + 1:] for r in rows]
+    return edit
+
+
+@pytest.fixture
+def models_csv(tmp_path):
+    # written back once, so later rewrites only differ where edited
+    path = shutil.copy(os.path.join(HERE, ingest.MODELS_CSV), tmp_path)
+    rewrite(path, lambda header, rows: (header, rows))
+    return path
+
+
+def full_clean(path):
+    return ingest.clean_models(pd.read_csv(path))
+
+
+def same_rows(df, path):
+    expected = full_clean(path)
+    assert list(df['system']) == list(expected['system'])
+    # long free text stays in the snapshot (schema.lazy_columns)
+    assert set(df.columns) == set(expected.columns) - set(lazy_columns(list(expected.columns)))
+
+
+def test_changed_row_is_recleaned(models_csv):
+    ingest.load_models(models_csv)
+    def edit(header, rows):
+        rows[3][header.index('Parameters')] = '12345'
+        return header, rows
+    header, rows = rewrite(models_csv, edit)
+    df = ingest.load_models(models_csv)
+    assert df['parameters'].iloc[3] == 12345.0
+    diff = refresh.last_diff(models_csv)
+    assert diff is not None and list(diff.changed) == [rows[3][header.index('System')]]
+
+
+def test_added_column(models_csv):
+    ingest.load_models(models_csv)
+    rewrite(models_csv, add_column('Extra notes', 'x'))
+    df = ingest.load_models(models_csv)
+    same_rows(df, models_csv)
+    assert 'extra_notes' in ingest.load_model_text(['extra_notes'], models_csv).columns
+
+
+def test_removed_column(models_csv):
+    ingest.load_models(models_csv)
+    rewrite(models_csv, drop_column('Organization'))
+    df = ingest.load_models(models_csv)
+    same_rows(df, models_csv)
+    assert 'organization' not in df.columns
+
+
+def test_catalog_source_gains_a_column(tmp_path):
+    paths = tuple(shutil.copy(os.path.join(HERE, p), tmp_path) for p in catalog.CATALOG_SOURCES)
+    before = catalog.load_catalog(paths)
+    rewrite(paths[0], add_column('Extra notes', 'x'))
+    after = catalog.load_catalog(paths)
+    assert len(after) == len(before)
+
+
+def append_copies(path, n):
+    # n existing rows again under new system names
+    with open(path, newline='', encoding='utf-8') as fh:
+        header, *rows = list(csv.reader(fh))
+    name = header.index('System')
+    new = [r[:name] + [f"{r[name]} (copy)"] + r[name + 1:] for r in rows[:n]]
+    with open(path, 'a', newline='', encoding='utf-8') as fh:
+        csv.writer(fh).writerows(new)
+    return [r[name] for r in new]
+
+
+def test_appended_rows_skip_the_full_diff(models_csv, monkeypatch):
+    before = ingest.load_models(models_csv)
+    names = append_copies(models_csv, 2)
+    def no_splice(*args):
+        raise AssertionError('appended rows went through the full diff')
+    monkeypatch.setattr(refresh, '_splice', no_splice)
+    df = ingest.load_models(models_csv)
+    assert list(df['system']) == list(before['system']) + names
+    pd.testing.assert_series_equal(df['parameters'].iloc[-2:], before['parameters'].iloc[:2], check_index=False)
+    diff = refresh.last_diff(models_csv)
+    assert list(diff.inserted) == names and diff.changed.empty
+    same_rows(df, models_csv)
+
+
+def test_edit_before_append_is_diffed(models_csv):
+    ingest.load_models(models_csv)
+    def edit(header, rows):
+        rows[3][header.index('Parameters')] = '12345'
+        return header, rows
+    header, rows = rewrite(models_csv, edit)
+    names = append_copies(models_csv, 1)
+    df = ingest.load_models(models_csv)
+    assert df['parameters'].iloc[3] == 12345.0
+    diff = refresh.last_diff(models_csv)
+    assert list(diff.inserted) == names
+    assert list(diff.changed) == [rows[3][header.index('System')]]
+
+
+def test_corrupt_state_rebuilds_in_full(models_csv):
+    ingest.load_models(models_csv)
+    state = refresh.state_path(models_csv, 'models', ingest.CLEANER_VERSION)
+    with open(state, 'r+b') as fh:
+        fh.truncate(os.path.getsize(state) // 2)
+    append_copies(models_csv, 1)
+    df = ingest.load_models(models_csv)
+    same_rows(df, models_csv)
+    assert refresh.last_diff(models_csv) is None